@@ -7,26 +7,38 @@ CENTRAL_SERVER_URL = os.getenv('CENTRAL_SERVER_URL', 'http://localhost:5000')
 DEVICE_ID = os.getenv('DEVICE_ID')
 DEVICE_TOKEN = os.getenv('DEVICE_TOKEN')
 RELAY_CONFIG_PATH = 'relay_config.json'
-SYNC_INTERVAL = 5  # seconds
+SYNC_INTERVAL = 5  # seconds, retry delay when the central server is unreachable
+LONG_POLL_TIMEOUT = int(os.getenv('LONG_POLL_TIMEOUT', '25'))
 
 if not DEVICE_ID or not DEVICE_TOKEN:
     print('ERROR: DEVICE_ID and DEVICE_TOKEN must be set as environment variables.')
     exit(1)
 
+relay_config_etag = None
+
 def fetch_relay_config():
+    """Returns True if the relay config changed, False if unchanged and None if the fetch failed."""
+    global relay_config_etag
     url = f"{CENTRAL_SERVER_URL}/api/devices/{DEVICE_ID}/relays/config"
     headers = {'X-Device-Token': DEVICE_TOKEN}
+    if relay_config_etag:
+        headers['If-None-Match'] = relay_config_etag
     try:
         resp = requests.get(url, headers=headers, timeout=10)
+        if resp.status_code == 304:
+            return False
         if resp.status_code == 200:
             data = resp.json()
             with open(RELAY_CONFIG_PATH, 'w') as f:
                 json.dump(data['relays'], f, indent=2)
+            relay_config_etag = resp.headers.get('ETag')
             print(f"[agent] Synced relay config: {data['relays']}")
+            return True
         else:
             print(f"[agent] Failed to fetch relay config: {resp.status_code} {resp.text}")
     except Exception as e:
         print(f"[agent] Exception fetching relay config: {e}")
+    return None
 
 def update_relay_status(relay_id, status):
     url = f"{CENTRAL_SERVER_URL}/api/relays/{relay_id}/status"
@@ -41,11 +53,75 @@ def update_relay_status(relay_id, status):
     except Exception as e:
         print(f"[agent] Exception updating relay status: {e}")
 
+def apply_relay_commands(commands):
+    """Write relay commands from the central server into the relay config; returns acks."""
+    try:
+        with open(RELAY_CONFIG_PATH, 'r') as f:
+            relays = json.load(f)
+    except Exception as e:
+        return [{'id': c['id'], 'ok': False, 'error': f'Relay config unavailable: {e}'} for c in commands]
+    by_id = {str(r['id']): r for r in relays}
+    acks = []
+    for command in commands:
+        relay = by_id.get(str(command['relay_id']))
+        if relay is None:
+            acks.append({'id': command['id'], 'ok': False, 'error': 'Relay not found'})
+            continue
+        relay['status'] = bool(command['status'])
+        acks.append({'id': command['id'], 'ok': True})
+        print(f"[agent] Relay {command['relay_id']} set to {relay['status']} by command {command['id']}")
+    with open(RELAY_CONFIG_PATH, 'w') as f:
+        json.dump(relays, f, indent=2)
+    return acks
+
+def acknowledge_relay_commands(acks):
+    url = f"{CENTRAL_SERVER_URL}/api/devices/{DEVICE_ID}/relays/commands/ack"
+    headers = {'Content-Type': 'application/json', 'X-Device-Token': DEVICE_TOKEN}
+    try:
+        resp = requests.post(url, headers=headers, json={'acks': acks}, timeout=10)
+        if resp.status_code == 200:
+            return True
+        print(f"[agent] Failed to acknowledge relay commands: {resp.status_code} {resp.text}")
+    except Exception as e:
+        print(f"[agent] Exception acknowledging relay commands: {e}")
+    return False
+
+def wait_for_config_change(config_version):
+    """Long-poll for a config change; applies and acknowledges relay commands in the response.
+
+    Returns (latest config version, True if the relay config needs re-fetching).
+    """
+    url = f"{CENTRAL_SERVER_URL}/api/devices/{DEVICE_ID}/config/wait"
+    params = {'timeout': LONG_POLL_TIMEOUT}
+    if config_version is not None:
+        params['version'] = config_version
+    headers = {'X-Device-Token': DEVICE_TOKEN}
+    resp = requests.get(url, headers=headers, params=params, timeout=LONG_POLL_TIMEOUT + 10)
+    if resp.status_code == 200:
+        data = resp.json()
+        commands = data.get('commands') or []
+        if commands and not acknowledge_relay_commands(apply_relay_commands(commands)):
+            time.sleep(SYNC_INTERVAL)  # Unacked commands are redelivered by the next poll
+        new_version = data.get('config_version')
+        return new_version, bool(data.get('changed')) or new_version != config_version
+    print(f"[agent] Config long-poll unavailable ({resp.status_code}), polling every {SYNC_INTERVAL}s")
+    time.sleep(SYNC_INTERVAL)
+    return config_version, True
+
 def main():
     print(f"[agent] Starting agent for device {DEVICE_ID}")
+    config_version = None
+    config_changed = True  # Fetch on the first pass
     while True:
-        fetch_relay_config()
-        time.sleep(SYNC_INTERVAL)
+        # Idle timeouts and command-only responses leave the relay config untouched
+        synced = not config_changed or fetch_relay_config() is not None
+        try:
+            config_version, config_changed = wait_for_config_change(config_version)
+            config_changed = config_changed or not synced  # Retry a failed fetch on the next pass
+        except Exception as e:
+            print(f"[agent] Exception waiting for config change: {e}")
+            config_changed = True  # Re-fetch after an error in case a change was missed
+            time.sleep(SYNC_INTERVAL)
 
 if __name__ == '__main__':
     main() 
\ No newline at end of file
@@ -6,26 +6,45 @@ A Flask-based REST API for factory IoT management
 
 import os
 import json
-import psutil
 import time
 import logging
-from datetime import datetime
-from flask import Flask, jsonify, request
+import logging.handlers
+import queue
+import uuid
+from datetime import datetime, timezone
+from flask import Flask, jsonify, request, Response, stream_with_context
 from flask_cors import CORS
-from threading import Thread
+from threading import Thread, Lock
 import requests
 from dotenv import load_dotenv
+from event_queue import OutboundEventQueue
+from event_stream import EventFeed
+from log_reader import LogReader
+from journal import EventJournal
+from stats_sampler import SystemStatsSampler
+from motion_debounce import MotionDebouncer, sensitivity_settings
+from motion_schedule import ScheduleRegistry
+from relay_reporter import RelayStateReporter
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('motion_sensor.log'),
-        logging.StreamHandler()
-    ]
+# Configure logging: handlers run on a listener thread so GPIO callbacks never block on file I/O
+MOTION_LOG_PATH = 'motion_sensor.log'
+log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+log_file_handler = logging.handlers.RotatingFileHandler(
+    MOTION_LOG_PATH,
+    maxBytes=int(os.getenv('LOG_MAX_BYTES', str(5 * 1024 * 1024))),
+    backupCount=int(os.getenv('LOG_BACKUP_COUNT', '3'))
 )
+log_stream_handler = logging.StreamHandler()
+for handler in (log_file_handler, log_stream_handler):
+    handler.setFormatter(log_formatter)
+log_queue = queue.Queue(-1)
+log_queue_handler = logging.handlers.QueueHandler(log_queue)
+log_queue_handler.setFormatter(logging.Formatter('%(message)s'))  # Full format is applied by the listener's handlers
+logging.basicConfig(level=logging.INFO, handlers=[log_queue_handler])
+log_listener = logging.handlers.QueueListener(log_queue, log_file_handler, log_stream_handler)
+log_listener.start()
 logger = logging.getLogger('motion_sensor')
+motion_log_reader = LogReader(MOTION_LOG_PATH)
 
 app = Flask(__name__)
 CORS(app)
@@ -37,7 +56,19 @@ DEVICE_TOKEN = os.getenv('DEVICE_TOKEN')
 CENTRAL_SERVER_URL = os.getenv('CENTRAL_SERVER_URL', 'http://localhost:5000')
 RELAY_CONFIG_PATH = os.path.join(os.path.dirname(__file__), 'relay_config.json')
 MOTION_SENSOR_CONFIG_PATH = os.path.join(os.path.dirname(__file__), 'motion_sensor_config.json')
-SYNC_INTERVAL = 5
+SYNC_INTERVAL = 5  # Retry delay when the central server is unreachable
+LONG_POLL_TIMEOUT = int(os.getenv('LONG_POLL_TIMEOUT', '25'))
+EVENT_QUEUE_PATH = os.getenv('EVENT_QUEUE_PATH', os.path.join(os.path.dirname(__file__), 'outbound_events.db'))
+EVENT_QUEUE_MAX_DEPTH = int(os.getenv('EVENT_QUEUE_MAX_DEPTH', '50000'))
+EVENT_BATCH_SIZE = int(os.getenv('EVENT_BATCH_SIZE', '100'))
+TELEMETRY_INTERVAL = int(os.getenv('TELEMETRY_INTERVAL', '60'))  # seconds between telemetry samples pushed upstream
+TELEMETRY_QUEUE_PATH = os.getenv('TELEMETRY_QUEUE_PATH', os.path.join(os.path.dirname(__file__), 'outbound_telemetry.db'))
+JOURNAL_DIR = os.getenv('JOURNAL_DIR', os.path.join(os.path.dirname(__file__), 'journal'))
+JOURNAL_SEGMENT_BYTES = int(os.getenv('JOURNAL_SEGMENT_BYTES', str(1024 * 1024)))
+JOURNAL_MAX_SEGMENTS = int(os.getenv('JOURNAL_MAX_SEGMENTS', '32'))
+
+# Structured journal of motion, relay and sync events (source for the log endpoints)
+journal = EventJournal(JOURNAL_DIR, JOURNAL_SEGMENT_BYTES, JOURNAL_MAX_SEGMENTS).start()
 
 # Load configuration
 def load_config():
@@ -56,6 +87,13 @@ def load_config():
 
 config = load_config()
 
+# System stats are sampled in the background; requests read the latest sample
+stats_config = config.get('stats', {})
+stats_sampler = SystemStatsSampler(
+    interval=stats_config.get('sample_interval', 5),
+    history_size=stats_config.get('history_size', 720)
+).start()
+
 # Sample IoT data
 iot_devices = {
     "sensor_001": {
@@ -104,15 +142,81 @@ except ImportError as e:
 # Relay management
 relay_objs = {}
 relay_defs = []
+relay_config_etag = None  # ETag of the last relay config fetched from the central server
+applied_relay_defs = {}  # relay id (str) -> definition currently driving relay_objs
+relay_command_ids = {}  # relay id (str) -> newest central command id reflected in the relay's state
+relay_switch_lock = Lock()  # Orders local switches against central commands and config reloads
+gpio_reload_stats = {}  # Outcome and duration of the last relay / motion sensor reload
 
 # Motion sensor management
 motion_sensor_objs = {}
 motion_sensor_defs = []
 motion_detection_callbacks = []
-motion_alerts = []  # Store motion alerts for frontend
+motion_alerts = EventFeed(maxlen=100)  # Last 100 motion alerts for frontend, pushed over SSE
+motion_debouncer = MotionDebouncer()  # Per-sensor delay_time / trigger_mode windows
+motion_schedules = ScheduleRegistry()  # Sensor id -> config and compiled schedule, rebuilt on config load
+motion_sensor_config_etag = None  # ETag of the last motion sensor config fetched from the central server
+applied_motion_sensor_defs = {}  # sensor id (str) -> definition currently backing motion_sensor_objs
+
+def reconcile_relays(new_defs):
+    """Apply only the relay channels that were added, removed or changed.
+
+    Unchanged relays keep their OutputDevice and current output, so a reload
+    never glitches channels the new config did not touch.
+    """
+    started = time.perf_counter()
+    new_by_id = {str(r['id']): r for r in new_defs}
+    added = removed = changed = unchanged = 0
+
+    for relay_id in list(applied_relay_defs):
+        if relay_id not in new_by_id:
+            obj = relay_objs.pop(relay_id, None)
+            if obj:
+                obj.close()
+            del applied_relay_defs[relay_id]
+            removed += 1
+            logger.info(f"Relay {relay_id} removed")
+
+    for relay_id, r in new_by_id.items():
+        old = applied_relay_defs.get(relay_id)
+        try:
+            if old is None or old['gpio_pin'] != r['gpio_pin']:
+                if old is not None:
+                    relay_objs.pop(relay_id).close()
+                relay_objs[relay_id] = OutputDevice(r['gpio_pin'])
+                relay_objs[relay_id].value = bool(r.get('status'))
+                if old is None:
+                    added += 1
+                else:
+                    changed += 1
+                logger.info(f"Relay {r['id']} initialized on GPIO {r['gpio_pin']} - {'ON' if r.get('status') else 'OFF'}")
+            elif bool(old.get('status')) != bool(r.get('status')):
+                relay_objs[relay_id].value = bool(r.get('status'))
+                changed += 1
+                journal.record('relay', relay_id=relay_id, action='on' if r.get('status') else 'off', source='config')
+                logger.info(f"Relay {r['id']} on GPIO {r['gpio_pin']} switched {'ON' if r.get('status') else 'OFF'}")
+            else:
+                unchanged += 1
+            applied_relay_defs[relay_id] = dict(r)
+            relay_command_ids[relay_id] = max(relay_command_ids.get(relay_id, 0), int(r.get('last_command_id') or 0))
+        except Exception as e:
+            # Leave it out of applied_relay_defs so the next reload retries it
+            relay_objs.pop(relay_id, None)
+            applied_relay_defs.pop(relay_id, None)
+            logger.error(f"Failed to initialize relay {r['id']} on GPIO {r['gpio_pin']}: {e}")
+
+    gpio_reload_stats['relays'] = {
+        'added': added,
+        'removed': removed,
+        'changed': changed,
+        'unchanged': unchanged,
+        'duration_ms': round((time.perf_counter() - started) * 1000, 3),
+        'reloaded_at': datetime.now().isoformat()
+    }
+    logger.info(f"Relay reload: {gpio_reload_stats['relays']}")
 
 def load_relay_config():
-    global relay_defs, relay_objs
+    global relay_defs
     try:
         with open(RELAY_CONFIG_PATH, 'r') as f:
             relay_defs = json.load(f)
@@ -121,31 +225,32 @@ def load_relay_config():
         relay_defs = []
         logger.error(f"Failed to load relay config: {e}")
     
-    # (Re)initialize relay objects
     if RELAY_ENABLED:
-        relay_objs = {}
-        for r in relay_defs:
-            try:
-                relay_objs[str(r['id'])] = OutputDevice(r['gpio_pin'])
-                # Sync relay state with status
-                if r.get('status'):
-                    relay_objs[str(r['id'])].on()
-                    logger.info(f"Relay {r['id']} initialized on GPIO {r['gpio_pin']} - ON")
-                else:
-                    relay_objs[str(r['id'])].off()
-                    logger.info(f"Relay {r['id']} initialized on GPIO {r['gpio_pin']} - OFF")
-            except Exception as e:
-                logger.error(f"Failed to initialize relay {r['id']} on GPIO {r['gpio_pin']}: {e}")
+        with relay_switch_lock:
+            reconcile_relays(relay_defs)
     print(f"[backend] Loaded relay config: {relay_defs}")
 
 def sync_relay_config():
+    """Fetch relay config from the central server.
+
+    Returns True if it changed, False if it is unchanged and None if the
+    fetch failed.
+
+    Sends the last seen ETag so an unchanged config costs a bodyless 304 and
+    skips parsing, the file write and the GPIO reload.
+    """
+    global relay_config_etag
     if not DEVICE_ID or not DEVICE_TOKEN:
         logger.warning('DEVICE_ID and DEVICE_TOKEN not set, skipping relay sync.')
-        return
+        return None
     url = f"{CENTRAL_SERVER_URL}/api/devices/{DEVICE_ID}/relays/config"
     headers = {'X-Device-Token': DEVICE_TOKEN}
+    if relay_config_etag:
+        headers['If-None-Match'] = relay_config_etag
     try:
         resp = requests.get(url, headers=headers, timeout=10)
+        if resp.status_code == 304:
+            return False
         if resp.status_code == 200:
             data = resp.json()
             with open(RELAY_CONFIG_PATH, 'w') as f:
@@ -153,39 +258,125 @@ def sync_relay_config():
             logger.info(f"Relay config synced from central server: {len(data.get('relays', []))} relays")
             print(f"[backend] Synced relay config from central server.")
             load_relay_config()
+            relay_config_etag = resp.headers.get('ETag')
+            journal.record('sync', target='relay_config', ok=True, relays=len(data.get('relays', [])))
+            return True
         else:
+            journal.record('sync', target='relay_config', ok=False, status_code=resp.status_code)
             logger.error(f"Failed to sync relay config: {resp.status_code} {resp.text}")
             print(f"[backend] Failed to sync relay config: {resp.status_code} {resp.text}")
     except Exception as e:
+        journal.record('sync', target='relay_config', ok=False, error=str(e))
         logger.error(f"Exception syncing relay config: {e}")
         print(f"[backend] Exception syncing relay config: {e}")
+    return None
 
-def update_central_status(relay_id, status):
-    if not DEVICE_ID or not DEVICE_TOKEN:
-        logger.warning('DEVICE_ID and DEVICE_TOKEN not set, cannot update central.')
-        return
-    url = f"{CENTRAL_SERVER_URL}/api/relays/{relay_id}/status"
+# Pooled keep-alive connections for frequent small requests to the central server
+central_http = requests.Session()
+central_http.mount('http://', requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=4))
+central_http.mount('https://', requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=4))
+
+def send_relay_states_to_central(states):
+    """Report coalesced relay states in one request; used by the relay reporter."""
+    url = f"{CENTRAL_SERVER_URL}/api/devices/{DEVICE_ID}/relays/status"
     headers = {'Content-Type': 'application/json', 'X-Device-Token': DEVICE_TOKEN}
-    data = {'status': status}
     try:
-        resp = requests.put(url, headers=headers, json=data, timeout=10)
-        if resp.status_code == 200:
-            logger.info(f"Relay {relay_id} status updated to {status} in central server")
-            print(f"[backend] Updated relay {relay_id} status to {status} in central server.")
-        else:
-            logger.error(f"Failed to update relay {relay_id} status: {resp.status_code}")
-            print(f"[backend] Failed to update relay {relay_id} status: {resp.status_code} {resp.text}")
-    except Exception as e:
-        logger.error(f"Exception updating relay status: {e}")
-        print(f"[backend] Exception updating relay status: {e}")
+        resp = central_http.put(url, headers=headers, json={'relays': states}, timeout=10)
+    except requests.RequestException as e:
+        journal.record('sync', target='relay_status', relays=len(states), ok=False, error=str(e))
+        raise
+    journal.record('sync', target='relay_status', relays=len(states), ok=resp.status_code == 200,
+                   status_code=resp.status_code)
+    if resp.status_code != 200:
+        raise RuntimeError(f"central server returned {resp.status_code}: {resp.text[:200]}")
+    result = resp.json()
+    logger.info(f"Relay states reported to central server: {result.get('updated', 0)} updated")
+    if result.get('stale'):
+        # Central issued newer commands for these relays; they arrive via the long-poll
+        logger.warning(f"Relay states {result['stale']} superseded by pending central commands")
+    return result
+
+relay_reporter = RelayStateReporter(send_relay_states_to_central)
 
 # Motion sensor management
 motion_sensor_objs = {}
 motion_sensor_defs = []
 motion_detection_callbacks = []
 
+def create_motion_callback(sensor_id):
+    def callback():
+        # Debounce first so suppressed edges cost no logging, alerts or reports
+        allowed, coalesced = motion_debouncer.allow(sensor_id)
+        if not allowed:
+            return
+        logger.info(f"Motion callback triggered for sensor {sensor_id} ({coalesced} edges coalesced)")
+        print(f"[DEBUG] Motion callback triggered for sensor {sensor_id}")
+        handle_motion_detection(sensor_id, coalesced)
+    return callback
+
+def reconcile_motion_sensors(new_defs):
+    """Apply only the motion sensors that were added, removed, re-pinned or (de)activated.
+
+    Unchanged sensors keep their MotionSensor object and when_motion callback,
+    so motion is never missed during a config reload. Debounce windows are
+    updated in place; a sensitivity change recreates the sensor because
+    gpiozero fixes its smoothing at construction.
+    """
+    started = time.perf_counter()
+    new_by_id = {str(ms['id']): ms for ms in new_defs if ms.get('is_active', True)}
+    added = removed = changed = unchanged = 0
+
+    for sensor_id in list(applied_motion_sensor_defs):
+        if sensor_id not in new_by_id:
+            obj = motion_sensor_objs.pop(sensor_id, None)
+            if obj:
+                obj.close()
+            del applied_motion_sensor_defs[sensor_id]
+            motion_debouncer.remove(sensor_id)
+            removed += 1
+            logger.info(f"Motion sensor {sensor_id} removed or disabled")
+
+    for sensor_id, ms in new_by_id.items():
+        old = applied_motion_sensor_defs.get(sensor_id)
+        motion_debouncer.configure(sensor_id, ms.get('delay_time'), ms.get('trigger_mode'))
+        if (old is not None and old['gpio_pin'] == ms['gpio_pin']
+                and old.get('sensitivity') == ms.get('sensitivity')):
+            applied_motion_sensor_defs[sensor_id] = dict(ms)
+            unchanged += 1
+            continue
+        try:
+            if old is not None:
+                motion_sensor_objs.pop(sensor_id).close()
+            logger.info(f"Setting up motion sensor {ms['id']} on GPIO {ms['gpio_pin']}")
+            motion_sensor = MotionSensor(ms['gpio_pin'], **sensitivity_settings(ms.get('sensitivity')))
+            motion_sensor.when_motion = create_motion_callback(ms['id'])
+            motion_sensor_objs[sensor_id] = motion_sensor
+            applied_motion_sensor_defs[sensor_id] = dict(ms)
+            if old is None:
+                added += 1
+            else:
+                changed += 1
+            logger.info(f"Motion sensor {ms['id']} initialized successfully on GPIO {ms['gpio_pin']}")
+        except Exception as e:
+            motion_sensor_objs.pop(sensor_id, None)
+            applied_motion_sensor_defs.pop(sensor_id, None)
+            error_msg = f"Failed to initialize motion sensor {ms['id']} on GPIO {ms['gpio_pin']}: {e}"
+            logger.error(error_msg)
+            print(error_msg)
+
+    motion_detection_callbacks[:] = list(motion_sensor_objs.values())
+    gpio_reload_stats['motion_sensors'] = {
+        'added': added,
+        'removed': removed,
+        'changed': changed,
+        'unchanged': unchanged,
+        'duration_ms': round((time.perf_counter() - started) * 1000, 3),
+        'reloaded_at': datetime.now().isoformat()
+    }
+    logger.info(f"Motion sensor reload: {gpio_reload_stats['motion_sensors']}")
+
 def load_motion_sensor_config():
-    global motion_sensor_defs, motion_sensor_objs
+    global motion_sensor_defs
     try:
         with open(MOTION_SENSOR_CONFIG_PATH, 'r') as f:
             motion_sensor_defs = json.load(f)
@@ -195,96 +386,28 @@ def load_motion_sensor_config():
         logger.error(f"Failed to load motion sensor config: {e}")
         print(f"[DEBUG] Failed to load motion sensor config: {e}")
         motion_sensor_defs = []
+    motion_schedules.load(motion_sensor_defs)
     
-    # (Re)initialize motion sensor objects
     if MOTION_SENSOR_ENABLED:
-        motion_sensor_objs = {}
-        motion_detection_callbacks.clear()
-        
-        logger.info(f"Initializing {len(motion_sensor_defs)} motion sensors...")
-        print(f"[DEBUG] Initializing {len(motion_sensor_defs)} motion sensors...")
-        
-        for ms in motion_sensor_defs:
-            if ms.get('is_active', True):
-                try:
-                    logger.info(f"Setting up motion sensor {ms['id']} on GPIO {ms['gpio_pin']}")
-                    print(f"[DEBUG] Setting up motion sensor {ms['id']} on GPIO {ms['gpio_pin']}")
-                    
-                    motion_sensor = MotionSensor(ms['gpio_pin'])
-                    motion_sensor_objs[str(ms['id'])] = motion_sensor
-                    
-                    # Set up motion detection callback
-                    def create_callback(sensor_id):
-                        def callback():
-                            logger.info(f"Motion callback triggered for sensor {sensor_id}")
-                            print(f"[DEBUG] Motion callback triggered for sensor {sensor_id}")
-                            handle_motion_detection(sensor_id)
-                        return callback
-                    
-                    motion_sensor.when_motion = create_callback(ms['id'])
-                    motion_detection_callbacks.append(motion_sensor)
-                    
-                    logger.info(f"Motion sensor {ms['id']} initialized successfully on GPIO {ms['gpio_pin']}")
-                    print(f"[DEBUG] Motion sensor {ms['id']} callback set successfully")
-                    
-                except Exception as e:
-                    error_msg = f"Failed to initialize motion sensor {ms['id']} on GPIO {ms['gpio_pin']}: {e}"
-                    logger.error(error_msg)
-                    print(error_msg)
-            else:
-                logger.info(f"Motion sensor {ms['id']} is disabled, skipping initialization")
+        reconcile_motion_sensors(motion_sensor_defs)
     else:
         logger.warning("Motion sensor control not enabled")
         print("[DEBUG] Motion sensor control not enabled")
 
-def is_motion_detection_allowed(sensor_config):
-    """Check if motion detection is allowed based on time scheduling"""
-    if not sensor_config.get('enable_scheduling', False):
-        return True
-    
-    now = datetime.now()
-    current_time = now.time()
-    current_weekday = now.weekday()  # 0=Monday, 6=Sunday
-    
-    # Check weekday/weekend monitoring
-    is_weekend = current_weekday >= 5  # Saturday or Sunday
-    if is_weekend and not sensor_config.get('weekend_monitoring', True):
-        return False
-    if not is_weekend and not sensor_config.get('weekday_monitoring', True):
-        return False
-    
-    # Check time range
-    start_time = sensor_config.get('start_time')
-    end_time = sensor_config.get('end_time')
-    
-    if start_time and end_time:
-        # Convert string times to time objects if needed
-        if isinstance(start_time, str):
-            start_time = datetime.strptime(start_time, '%H:%M').time()
-        if isinstance(end_time, str):
-            end_time = datetime.strptime(end_time, '%H:%M').time()
-        
-        # Handle overnight ranges (e.g., 22:00 to 06:00)
-        if start_time > end_time:
-            return current_time >= start_time or current_time <= end_time
-        else:
-            return start_time <= current_time <= end_time
-    
-    return True
-
-def handle_motion_detection(sensor_id):
+def handle_motion_detection(sensor_id, coalesced=0):
     """Handle motion detection from GPIO sensor with time scheduling"""
     try:
         timestamp = datetime.now()
         logger.info(f"🎯 MOTION DETECTED on sensor {sensor_id} at {timestamp}")
         print(f"Motion detected on sensor {sensor_id}")
         
-        # Find sensor config
-        sensor_config = next((s for s in motion_sensor_defs if s['id'] == sensor_id), None)
-        if not sensor_config:
+        # Find sensor config and its compiled schedule (O(1), int or str id)
+        schedule = motion_schedules.get(sensor_id)
+        if not schedule:
             logger.error(f"Sensor config not found for sensor {sensor_id}")
             print(f"Sensor config not found for sensor {sensor_id}")
             return
+        sensor_config = schedule.config
         
         # Log detailed sensor information
         logger.info(f"📊 Sensor Details - ID: {sensor_id}, Name: {sensor_config.get('name')}, GPIO: {sensor_config.get('gpio_pin')}")
@@ -301,7 +424,8 @@ def handle_motion_detection(sensor_id):
         send_motion_alert_to_frontend(sensor_id, sensor_config)
         
         # Check if motion detection is allowed based on scheduling for central server reporting
-        if not is_motion_detection_allowed(sensor_config):
+        if not schedule.is_allowed():
+            journal.record('motion', ts=timestamp.timestamp(), sensor_id=sensor_id, reported=False, coalesced=coalesced)
             logger.info(f"🚫 Motion detection not allowed for sensor {sensor_id} at current time (no central server report)")
             print(f"Motion detection not allowed for sensor {sensor_id} at current time (no central server report)")
             return
@@ -309,31 +433,25 @@ def handle_motion_detection(sensor_id):
         logger.info(f"✅ Motion detection allowed for sensor {sensor_id}, reporting to central server")
         print(f"Motion detection allowed for sensor {sensor_id}, reporting to central server")
         
-        # Report to central server
-        report_motion_to_central_server(sensor_id)
+        # Queue report to central server (delivered by the outbound queue sender)
+        event_id = report_motion_to_central_server(sensor_id, timestamp)
+        journal.record('motion', ts=timestamp.timestamp(), sensor_id=sensor_id, reported=True, event_id=event_id,
+                       coalesced=coalesced)
         
     except Exception as e:
         logger.error(f"❌ Error handling motion detection: {e}")
         print(f"Error handling motion detection: {e}")
 
 def send_motion_alert_to_frontend(sensor_id, sensor_config):
-    """Send motion alert to frontend via WebSocket or HTTP endpoint"""
+    """Publish a motion alert to frontends (SSE stream and /api/motion_alerts)"""
     try:
-        # Store motion alert in memory for frontend to fetch
-        alert = {
-            'id': len(motion_alerts) + 1,
+        # The feed assigns the alert id and keeps only the last 100 alerts
+        alert = motion_alerts.publish({
             'sensor_id': sensor_id,
             'sensor_name': sensor_config.get('name', f'Sensor {sensor_id}'),
             'timestamp': datetime.now().isoformat(),
             'message': f'Motion detected on {sensor_config.get("name", f"Sensor {sensor_id}")}'
-        }
-        
-        motion_alerts.append(alert)
-        
-        # Keep only last 100 alerts
-        if len(motion_alerts) > 100:
-            removed_alert = motion_alerts.pop(0)
-            logger.debug(f"Removed old alert: {removed_alert['id']}")
+        })
             
         logger.info(f"📱 Motion alert sent to frontend for sensor {sensor_id} - Alert ID: {alert['id']}")
         print(f"Motion alert sent to frontend for sensor {sensor_id}")
@@ -342,63 +460,212 @@ def send_motion_alert_to_frontend(sensor_id, sensor_config):
         logger.error(f"❌ Error sending motion alert to frontend: {e}")
         print(f"Error sending motion alert to frontend: {e}")
 
-def report_motion_to_central_server(sensor_id):
-    """Report motion detection to central server"""
+def report_motion_to_central_server(sensor_id, timestamp=None):
+    """Queue a motion event for delivery to the central server.
+
+    Runs on the GPIO callback thread, so it only enqueues; the outbound
+    queue's sender thread posts events in batches and retries on failure.
+    Returns the event id, or None if it could not be queued.
+    """
     try:
-        url = f"{CENTRAL_SERVER_URL}/api/motion_sensors/{sensor_id}/motion"
-        headers = {
-            'Content-Type': 'application/json',
-            'X-Device-Token': DEVICE_TOKEN
-        }
-        
-        logger.info(f"🌐 Reporting motion to central server: {url}")
-        
-        response = requests.post(url, headers=headers, timeout=10)
-        if response.status_code == 200:
-            logger.info(f"✅ Motion reported to central server for sensor {sensor_id}")
-            print(f"Motion reported to central server for sensor {sensor_id}")
-        else:
-            logger.error(f"❌ Failed to report motion to central server: {response.status_code} - {response.text}")
-            print(f"Failed to report motion to central server: {response.status_code}")
-            
+        detected_at = (timestamp or datetime.now()).astimezone(timezone.utc)
+        event_id = uuid.uuid4().hex
+        motion_event_queue.put({
+            'id': event_id,
+            'motion_sensor_id': int(sensor_id),
+            'timestamp': detected_at.isoformat()
+        })
+        return event_id
     except Exception as e:
-        logger.error(f"❌ Error reporting motion to central server: {e}")
-        print(f"Error reporting motion to central server: {e}")
+        logger.error(f"❌ Error queueing motion event for central server: {e}")
+        print(f"Error queueing motion event for central server: {e}")
+
+def send_motion_batch_to_central_server(events):
+    """Post a batch of queued motion events; used by the outbound queue sender."""
+    url = f"{CENTRAL_SERVER_URL}/api/devices/{DEVICE_ID}/motion/batch"
+    headers = {
+        'Content-Type': 'application/json',
+        'X-Device-Token': DEVICE_TOKEN
+    }
+    try:
+        response = requests.post(url, headers=headers, json={'events': events}, timeout=10)
+    except requests.RequestException as e:
+        journal.record('sync', target='motion_batch', ok=False, events=len(events), error=str(e))
+        raise
+    if response.status_code != 200:
+        journal.record('sync', target='motion_batch', ok=False, events=len(events), status_code=response.status_code)
+        raise RuntimeError(f"central server returned {response.status_code}: {response.text[:200]}")
+    result = response.json()
+    journal.record('sync', target='motion_batch', ok=True, events=len(events),
+                   accepted=result.get('accepted_count', 0), rejected=result.get('rejected_count', 0))
+    logger.info(f"🌐 Motion batch delivered: {result.get('accepted_count', 0)} accepted, {result.get('rejected_count', 0)} rejected")
+    return result
+
+motion_event_queue = OutboundEventQueue(
+    EVENT_QUEUE_PATH,
+    send_motion_batch_to_central_server,
+    name='motion',
+    batch_size=EVENT_BATCH_SIZE,
+    max_depth=EVENT_QUEUE_MAX_DEPTH
+)
+
+def send_telemetry_batch_to_central_server(samples):
+    """Post a batch of queued telemetry samples; used by the telemetry queue sender."""
+    url = f"{CENTRAL_SERVER_URL}/api/devices/{DEVICE_ID}/telemetry/batch"
+    headers = {
+        'Content-Type': 'application/json',
+        'X-Device-Token': DEVICE_TOKEN
+    }
+    response = requests.post(url, headers=headers, json={'samples': samples}, timeout=10)
+    if response.status_code != 200:
+        raise RuntimeError(f"central server returned {response.status_code}: {response.text[:200]}")
+    return response.json()
+
+telemetry_queue = OutboundEventQueue(
+    TELEMETRY_QUEUE_PATH,
+    send_telemetry_batch_to_central_server,
+    name='telemetry',
+    batch_size=EVENT_BATCH_SIZE,
+    max_depth=10000
+)
+
+def push_telemetry():
+    """Background thread: queue one averaged health sample every TELEMETRY_INTERVAL seconds"""
+    while True:
+        time.sleep(TELEMETRY_INTERVAL)
+        try:
+            points = stats_sampler.history(seconds=TELEMETRY_INTERVAL, points=1)
+            if not points:
+                continue
+            point = points[-1]
+            telemetry_queue.put({
+                'id': uuid.uuid4().hex,
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'cpu_percent': point['cpu_percent'],
+                'memory_percent': point['memory_percent'],
+                'disk_percent': point['disk_percent'],
+                'temperature': point['temperature']
+            })
+        except Exception as e:
+            logger.error(f"Error queueing telemetry sample: {e}")
 
 # Load configurations on startup
 load_relay_config()
 load_motion_sensor_config()
 
 # Background sync thread
+def apply_relay_commands(commands):
+    """Drive the pins for relay commands from the central server; returns acks."""
+    acks = []
+    for command in commands:
+        relay_id = str(command['relay_id'])
+        status = bool(command['status'])
+        relay = relay_objs.get(relay_id)
+        if relay is None:
+            acks.append({'id': command['id'], 'ok': False, 'error': 'Relay not found'})
+            logger.error(f"Relay command {command['id']}: relay {relay_id} not found")
+            continue
+        try:
+            with relay_switch_lock:
+                relay.value = status
+                relay_command_ids[relay_id] = max(relay_command_ids.get(relay_id, 0), command['id'])
+        except Exception as e:
+            acks.append({'id': command['id'], 'ok': False, 'error': str(e)})
+            logger.error(f"Relay command {command['id']} failed on relay {relay_id}: {e}")
+            continue
+        if relay_id in applied_relay_defs:
+            applied_relay_defs[relay_id]['status'] = status  # Keeps the next config reload from re-switching it
+        acks.append({'id': command['id'], 'ok': True})
+        journal.record('relay', relay_id=relay_id, action='on' if status else 'off', source='command',
+                       command_id=command['id'])
+        logger.info(f"Relay {relay_id} switched {'ON' if status else 'OFF'} by command {command['id']}")
+    return acks
+
+def acknowledge_relay_commands(acks):
+    url = f"{CENTRAL_SERVER_URL}/api/devices/{DEVICE_ID}/relays/commands/ack"
+    headers = {'Content-Type': 'application/json', 'X-Device-Token': DEVICE_TOKEN}
+    try:
+        resp = requests.post(url, headers=headers, json={'acks': acks}, timeout=10)
+        journal.record('sync', target='relay_command_ack', commands=len(acks), ok=resp.status_code == 200,
+                       status_code=resp.status_code)
+        if resp.status_code == 200:
+            return True
+        logger.error(f"Failed to acknowledge relay commands: {resp.status_code} {resp.text[:200]}")
+    except Exception as e:
+        journal.record('sync', target='relay_command_ack', commands=len(acks), ok=False, error=str(e))
+        logger.error(f"Exception acknowledging relay commands: {e}")
+    return False
+
+def wait_for_config_change(config_version):
+    """Long-poll the central server until the device config version changes.
+
+    Relay commands in the response are applied and acknowledged right away.
+    Returns (latest config version, True if the configs need re-syncing).
+    Falls back to a fixed SYNC_INTERVAL sleep, re-syncing every time, if the
+    central server does not support long-polling.
+    """
+    url = f"{CENTRAL_SERVER_URL}/api/devices/{DEVICE_ID}/config/wait"
+    params = {'timeout': LONG_POLL_TIMEOUT}
+    if config_version is not None:
+        params['version'] = config_version
+    headers = {'X-Device-Token': DEVICE_TOKEN}
+    resp = requests.get(url, headers=headers, params=params, timeout=LONG_POLL_TIMEOUT + 10)
+    if resp.status_code == 200:
+        data = resp.json()
+        commands = data.get('commands') or []
+        if commands and not acknowledge_relay_commands(apply_relay_commands(commands)):
+            time.sleep(SYNC_INTERVAL)  # Unacked commands are redelivered by the next poll
+        return data.get('config_version'), bool(data.get('changed'))
+    logger.warning(f"Config long-poll unavailable ({resp.status_code}), falling back to {SYNC_INTERVAL}s polling")
+    time.sleep(SYNC_INTERVAL)
+    return config_version, True
+
 def sync_with_central_server():
     """Background thread to sync with central server"""
+    config_version = None
+    config_changed = True  # Sync on the first pass
     while True:
         try:
-            # Sync relay config
-            if RELAY_ENABLED:
-                sync_relay_config()
+            # Idle timeouts and command-only responses leave the configs untouched
+            synced = True
+            if config_changed:
+                # Sync relay config
+                if RELAY_ENABLED:
+                    synced = sync_relay_config() is not None
+
+                # Sync motion sensor config
+                if MOTION_SENSOR_ENABLED:
+                    synced = sync_motion_sensor_config() is not None and synced
             
-            # Sync motion sensor config
-            if MOTION_SENSOR_ENABLED:
-                sync_motion_sensor_config()
+            # Block until the central server reports a config change or sends relay commands
+            new_version, config_changed = wait_for_config_change(config_version)
+            config_changed = config_changed or not synced  # Retry a failed sync on the next pass
+            if new_version != config_version and config_version is not None:
+                logger.info(f"🔄 Config version changed {config_version} -> {new_version}")
+            config_version = new_version
                 
         except Exception as e:
             logger.error(f"Error in sync thread: {e}")
             print(f"Error in sync thread: {e}")
-        
-        time.sleep(SYNC_INTERVAL)
+            config_changed = True  # Re-sync after an error in case a change was missed
+            time.sleep(SYNC_INTERVAL)
 
 def sync_motion_sensor_config():
-    """Sync motion sensor configuration with central server"""
-    global motion_sensor_defs
+    """Sync motion sensor configuration with central server; returns True if it changed, False if not, None on failure"""
+    global motion_sensor_defs, motion_sensor_config_etag
     try:
         url = f"{CENTRAL_SERVER_URL}/api/devices/{DEVICE_ID}/motion_sensors/config"
         headers = {'X-Device-Token': DEVICE_TOKEN}
+        if motion_sensor_config_etag:
+            headers['If-None-Match'] = motion_sensor_config_etag
         response = requests.get(url, headers=headers, timeout=10)
         
+        if response.status_code == 304:
+            return False
         if response.status_code == 200:
             data = response.json()
             new_motion_sensor_defs = data.get('motion_sensors', [])
+            motion_sensor_config_etag = response.headers.get('ETag')
             
             # Check if config changed
             if new_motion_sensor_defs != motion_sensor_defs:
@@ -414,17 +681,25 @@ def sync_motion_sensor_config():
                 
                 # Reload motion sensor objects
                 load_motion_sensor_config()
-                
+                journal.record('sync', target='motion_sensor_config', ok=True, sensors=len(motion_sensor_defs))
+                return True
+            return False
         else:
+            journal.record('sync', target='motion_sensor_config', ok=False, status_code=response.status_code)
             logger.warning(f"Failed to sync motion sensor config: {response.status_code}")
-            
     except Exception as e:
+        journal.record('sync', target='motion_sensor_config', ok=False, error=str(e))
         logger.error(f"Error syncing motion sensor config: {e}")
+    return None
 
 # Start background sync thread
 if DEVICE_ID and DEVICE_TOKEN:
     sync_thread = Thread(target=sync_with_central_server, daemon=True)
     sync_thread.start()
+    motion_event_queue.start()
+    telemetry_queue.start()
+    relay_reporter.start()
+    Thread(target=push_telemetry, daemon=True).start()
     logger.info(f"🔄 Started sync thread for device {DEVICE_ID}")
     print(f"Started sync thread for device {DEVICE_ID}")
 else:
@@ -457,13 +732,14 @@ def index():
 @app.route('/api/health')
 def health():
     """Health check endpoint"""
+    stats = stats_sampler.latest()
     return jsonify({
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
         "system": {
-            "cpu_percent": psutil.cpu_percent(),
-            "memory_percent": psutil.virtual_memory().percent,
-            "disk_percent": psutil.disk_usage('/').percent
+            "cpu_percent": stats["cpu"]["percent"],
+            "memory_percent": stats["memory"]["percent"],
+            "disk_percent": stats["disk"]["percent"]
         }
     })
 
@@ -526,50 +802,19 @@ def update_device_status(device_id):
 
 @app.route('/api/system/stats')
 def system_stats():
-    """Get system statistics"""
-    # Get temperatures (chipset/CPU)
-    temps = None
-    try:
-        temp_data = psutil.sensors_temperatures()
-        if temp_data:
-            # Pick the first available sensor and its first value
-            for sensor_name, entries in temp_data.items():
-                if entries:
-                    temps = {
-                        'sensor': sensor_name,
-                        'label': entries[0].label,
-                        'current': entries[0].current,
-                        'high': entries[0].high,
-                        'critical': entries[0].critical
-                    }
-                    break
-    except Exception:
-        temps = None
+    """Get the latest system statistics sample"""
+    return jsonify(stats_sampler.latest())
 
+@app.route('/api/system/stats/history')
+def system_stats_history():
+    """Get downsampled system stats history for charts (?seconds=, ?points=)"""
+    seconds = request.args.get('seconds', type=float)  # Unparseable values fall back to the defaults
+    points = max(1, min(request.args.get('points', 120, type=int), 1000))
+    series = stats_sampler.history(seconds, points)
     return jsonify({
-        "cpu": {
-            "percent": psutil.cpu_percent(interval=1),
-            "count": psutil.cpu_count(),
-            "frequency": psutil.cpu_freq()._asdict() if psutil.cpu_freq() else None
-        },
-        "memory": {
-            "total": psutil.virtual_memory().total,
-            "available": psutil.virtual_memory().available,
-            "percent": psutil.virtual_memory().percent,
-            "used": psutil.virtual_memory().used
-        },
-        "disk": {
-            "total": psutil.disk_usage('/').total,
-            "used": psutil.disk_usage('/').used,
-            "free": psutil.disk_usage('/').free,
-            "percent": psutil.disk_usage('/').percent
-        },
-        "network": {
-            "bytes_sent": psutil.net_io_counters().bytes_sent,
-            "bytes_recv": psutil.net_io_counters().bytes_recv
-        },
-        "temperature": temps,
-        "timestamp": datetime.now().isoformat()
+        "interval": stats_sampler.interval,
+        "points": series,
+        "count": len(series)
     })
 
 @app.route('/api/config')
@@ -601,17 +846,71 @@ def control_relay(relay_id):
     if not data or "action" not in data:
         return jsonify({"error": "Missing 'action' in request body"}), 400
     action = data["action"].lower()
-    relay = relay_objs[str(relay_id)]
-    if action == "on":
-        relay.on()
-        update_central_status(relay_id, True)
-        return jsonify({"status": f"{relay_id} turned on"}), 200
-    elif action == "off":
-        relay.off()
-        update_central_status(relay_id, False)
-        return jsonify({"status": f"{relay_id} turned off"}), 200
-    else:
+    if action not in ("on", "off"):
         return jsonify({"error": "Invalid action, use 'on' or 'off'"}), 400
+    relay = relay_objs[str(relay_id)]
+    with relay_switch_lock:
+        relay.on() if action == "on" else relay.off()
+        command_id = relay_command_ids.get(str(relay_id), 0)
+    journal.record('relay', relay_id=relay_id, action=action, source='api')
+    relay_reporter.report(relay_id, action == "on", command_id)
+    return jsonify({"status": f"{relay_id} turned {action}"}), 200
+
+@app.route('/api/relays/batch', methods=['POST'])
+def control_relays_batch():
+    """Switch several relays in one call.
+
+    Body: {"actions": [{"relay_id": "1", "action": "on"}, ...]}
+    or {"action": "off", "relay_ids": ["1", "2", ...]}.
+    All actions are validated first, then applied back to back so the
+    relays switch near-simultaneously. The response has a result per relay
+    and the new states are reported upstream in one request by the relay reporter.
+    """
+    if not RELAY_ENABLED:
+        return jsonify({"error": "Relay control not available on this system."}), 501
+    data = request.get_json(silent=True) or {}
+    actions = data.get('actions')
+    if actions is None and 'action' in data:
+        actions = [{'relay_id': relay_id, 'action': data['action']} for relay_id in data.get('relay_ids', [])]
+    if not isinstance(actions, list) or not actions:
+        return jsonify({"error": "Provide 'actions' or 'action' with 'relay_ids'"}), 400
+
+    results, planned = [], {}
+    for item in actions:
+        relay_id = str(item.get('relay_id', item.get('id'))) if isinstance(item, dict) else None
+        action = str(item.get('action', '')).lower() if isinstance(item, dict) else ''
+        if relay_id is None or relay_id not in relay_objs:
+            results.append({'relay_id': relay_id, 'ok': False, 'error': 'Relay not found'})
+        elif action not in ('on', 'off'):
+            results.append({'relay_id': relay_id, 'ok': False, 'error': "Invalid action, use 'on' or 'off'"})
+        else:
+            planned[relay_id] = action == 'on'  # Last action wins for duplicates
+
+    # Tight loop over pre-validated pins: no logging or I/O between switches
+    applied, started = {}, time.perf_counter()
+    switched_at = time.time()
+    with relay_switch_lock:
+        for relay_id, status in planned.items():
+            try:
+                relay_objs[relay_id].value = status
+                applied[relay_id] = (status, relay_command_ids.get(relay_id, 0))
+                results.append({'relay_id': relay_id, 'ok': True, 'status': status})
+            except Exception as e:
+                results.append({'relay_id': relay_id, 'ok': False, 'error': str(e)})
+    switch_ms = round((time.perf_counter() - started) * 1000, 3)
+
+    for relay_id, (status, command_id) in applied.items():
+        journal.record('relay', ts=switched_at, relay_id=relay_id, action='on' if status else 'off', source='api_batch')
+        relay_reporter.report(relay_id, status, command_id)
+    if applied:
+        logger.info(f"Batch switched {len(applied)} relays in {switch_ms} ms")
+    failed = sum(1 for r in results if not r['ok'])
+    return jsonify({
+        "results": results,
+        "applied": len(applied),
+        "failed": failed,
+        "switch_ms": switch_ms
+    }), 207 if failed else 200
 
 # Motion Sensor APIs
 @app.route('/api/motion_sensors', methods=['GET'])
@@ -711,67 +1010,193 @@ def get_motion_sensor_config():
         "count": len(motion_sensor_defs)
     })
 
+@app.route('/api/motion_sensors/debounce', methods=['GET'])
+def get_motion_debounce_stats():
+    """Get per-sensor debounce settings and accepted/suppressed motion counters"""
+    return jsonify(motion_debouncer.stats())
+
+@app.route('/api/gpio/reload_stats', methods=['GET'])
+def get_gpio_reload_stats():
+    """Get what the last relay / motion sensor config reload changed and how long it took"""
+    return jsonify(gpio_reload_stats)
+
+@app.route('/api/event_queue/stats', methods=['GET'])
+def get_event_queue_stats():
+    """Get outbound motion event queue depth, drain rate and drop counters
+
+    Also includes the telemetry queue and the relay state reporter.
+    """
+    stats = motion_event_queue.stats()
+    stats['telemetry'] = telemetry_queue.stats()
+    stats['relay_states'] = relay_reporter.stats()
+    return jsonify(stats)
+
 @app.route('/api/motion_alerts', methods=['GET'])
 def get_motion_alerts():
     """Get motion alerts for frontend"""
+    alerts = motion_alerts.snapshot()
     return jsonify({
-        "alerts": motion_alerts,
-        "count": len(motion_alerts)
+        "alerts": alerts,
+        "count": len(alerts),
+        "last_id": motion_alerts.last_id
     })
 
+@app.route('/api/motion_alerts/stream', methods=['GET'])
+def stream_motion_alerts():
+    """Push motion alerts as Server-Sent Events.
+
+    Reconnecting clients resume after the Last-Event-ID header (sent
+    automatically by EventSource) or ?last_id=; new clients start from now.
+    """
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('last_id')
+    try:
+        last_id = int(last_id) if last_id is not None else None
+    except ValueError:
+        return jsonify({"error": "last_id must be an integer"}), 400
+    return Response(
+        stream_with_context(motion_alerts.stream(last_id, event_type='motion_alert')),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/api/motion_alerts/clear', methods=['POST'])
 def clear_motion_alerts():
     """Clear all motion alerts"""
-    global motion_alerts
     motion_alerts.clear()
     logger.info("All motion alerts cleared")
     return jsonify({"message": "All motion alerts cleared"})
 
+def parse_journal_time(value):
+    """Parse a ?start=/?end= value (UNIX seconds or ISO-8601, naive = UTC) into UNIX seconds."""
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        ts = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        if ts.tzinfo is None:
+            ts = ts.replace(tzinfo=timezone.utc)
+        return ts.timestamp()
+
+def journal_query_args():
+    """Common journal filters from the query string; raises ValueError on bad input."""
+    return {
+        'start': parse_journal_time(request.args.get('start')),
+        'end': parse_journal_time(request.args.get('end')),
+        'limit': max(1, min(int(request.args.get('limit', 100)), 5000))
+    }
+
+def format_journal_entry(entry):
+    """Render a journal record as a single human-readable log line."""
+    detail = ' '.join(f"{k}={v}" for k, v in entry.items() if k not in ('ts', 'kind'))
+    return f"{datetime.fromtimestamp(entry['ts'], timezone.utc).isoformat()} {entry['kind']} {detail}"
+
+def journal_response(entries, **extra):
+    body = dict(extra)
+    body.update({
+        "logs": [format_journal_entry(e) for e in entries],
+        "events": entries,
+        "recent_lines": len(entries)
+    })
+    return jsonify(body)
+
 @app.route('/api/motion_sensors/logs', methods=['GET'])
 def get_motion_sensor_logs():
-    """Get recent motion sensor logs from the log file"""
+    """Get recent motion events from the journal (?format=text tails the raw log file)"""
     try:
-        log_file = 'motion_sensor.log'
-        if os.path.exists(log_file):
-            with open(log_file, 'r') as f:
-                lines = f.readlines()
-                # Return last 100 lines
-                recent_logs = lines[-100:] if len(lines) > 100 else lines
-                return jsonify({
-                    "logs": recent_logs,
-                    "total_lines": len(lines),
-                    "recent_lines": len(recent_logs)
-                })
-        else:
-            return jsonify({"error": "Log file not found"}), 404
+        if request.args.get('format') == 'text':
+            recent_logs, total_lines = motion_log_reader.tail(100)
+            return jsonify({
+                "logs": recent_logs,
+                "total_lines": total_lines,
+                "recent_lines": len(recent_logs)
+            })
+        return journal_response(journal.query(kind='motion', **journal_query_args()))
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query: {e}"}), 400
+    except FileNotFoundError:
+        return jsonify({"error": "Log file not found"}), 404
     except Exception as e:
         logger.error(f"Error reading log file: {e}")
         return jsonify({"error": f"Error reading logs: {e}"}), 500
 
 @app.route('/api/motion_sensors/<sensor_id>/logs', methods=['GET'])
 def get_sensor_specific_logs(sensor_id):
-    """Get logs for a specific motion sensor"""
+    """Get motion events for a specific sensor from the journal (?format=text greps the raw log file)"""
     try:
-        log_file = 'motion_sensor.log'
-        if os.path.exists(log_file):
-            with open(log_file, 'r') as f:
-                lines = f.readlines()
-                # Filter logs for specific sensor
-                sensor_logs = [line for line in lines if f"sensor {sensor_id}" in line.lower()]
-                # Return last 50 lines for this sensor
-                recent_sensor_logs = sensor_logs[-50:] if len(sensor_logs) > 50 else sensor_logs
-                return jsonify({
-                    "sensor_id": sensor_id,
-                    "logs": recent_sensor_logs,
-                    "total_lines": len(sensor_logs),
-                    "recent_lines": len(recent_sensor_logs)
-                })
-        else:
-            return jsonify({"error": "Log file not found"}), 404
+        if request.args.get('format') == 'text':
+            # Last 50 lines for this sensor, read through the per-sensor offset index
+            recent_sensor_logs, total_lines = motion_log_reader.sensor_tail(sensor_id, 50)
+            return jsonify({
+                "sensor_id": sensor_id,
+                "logs": recent_sensor_logs,
+                "total_lines": total_lines,
+                "recent_lines": len(recent_sensor_logs)
+            })
+        args = journal_query_args()
+        if 'limit' not in request.args:
+            args['limit'] = 50
+        return journal_response(journal.query(kind='motion', sensor_id=sensor_id, **args), sensor_id=sensor_id)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query: {e}"}), 400
+    except FileNotFoundError:
+        return jsonify({"error": "Log file not found"}), 404
     except Exception as e:
         logger.error(f"Error reading sensor logs: {e}")
         return jsonify({"error": f"Error reading sensor logs: {e}"}), 500
 
+@app.route('/api/journal', methods=['GET'])
+def query_journal():
+    """Query the event journal, newest first.
+
+    Filters: ?kind=motion,relay,sync ?sensor_id= ?relay_id= ?start= ?end= (UNIX seconds
+    or ISO-8601) ?limit= (default 100, max 5000).
+    """
+    try:
+        args = journal_query_args()
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query: {e}"}), 400
+    kinds = [k for k in request.args.get('kind', '').split(',') if k]
+    entries = journal.query(
+        kind=kinds,
+        sensor_id=request.args.get('sensor_id'),
+        relay_id=request.args.get('relay_id'),
+        **args
+    )
+    return jsonify({"events": entries, "count": len(entries), "journal": journal.stats()})
+
+@app.route('/api/journal/replay', methods=['POST'])
+def replay_journal():
+    """Re-queue journaled motion events for delivery to the central server.
+
+    Body: {"start": ..., "end": ..., "sensor_id": optional}. Only events that
+    passed the schedule check (reported=true) are replayed, with their
+    original event id and timestamp. The central server skips event ids it
+    already stored, so overlapping ranges are safe to replay.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        start = parse_journal_time(data.get('start'))
+        end = parse_journal_time(data.get('end'))
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid time range: {e}"}), 400
+    if start is None:
+        return jsonify({"error": "start is required"}), 400
+    entries = journal.query(start=start, end=end, kind='motion', sensor_id=data.get('sensor_id'), limit=None)
+    replayed = 0
+    for entry in reversed(entries):
+        if not entry.get('reported'):
+            continue
+        motion_event_queue.put({
+            'id': entry.get('event_id') or uuid.uuid4().hex,
+            'motion_sensor_id': int(entry['sensor_id']),
+            'timestamp': datetime.fromtimestamp(entry['ts'], timezone.utc).isoformat()
+        })
+        replayed += 1
+    journal.record('sync', target='replay', ok=True, events=replayed, start=start, end=end)
+    logger.info(f"Replaying {replayed} journaled motion events to central server")
+    return jsonify({"replayed": replayed})
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({"error": "Endpoint not found"}), 404
@@ -0,0 +1,220 @@
+"""
+Durable outbound event queue for the Factory IoT edge backend.
+
+Producers (e.g. GPIO callbacks) call ``put()``, which only appends to an
+in-memory buffer and wakes the sender thread. The sender thread persists the
+buffer to a small SQLite file, then drains it to the central server in
+batches, retrying with exponential backoff while the server is unreachable.
+Events survive restarts because they are only deleted once the central server
+has accepted (or permanently rejected) them.
+"""
+
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger('motion_sensor')
+
+
+class OutboundEventQueue:
+    """Disk-backed FIFO of JSON events drained by a background sender thread.
+
+    ``send_batch`` receives a list of event dicts and must return a dict with
+    ``accepted`` and ``rejected`` lists of event ids; both are removed from the
+    queue. Any exception is treated as a transient failure and retried.
+    """
+
+    def __init__(self, path, send_batch, name='events', batch_size=100,
+                 max_depth=50000, flush_interval=1.0, base_backoff=1.0,
+                 max_backoff=60.0):
+        self.path = path
+        self.send_batch = send_batch
+        self.name = name
+        self.batch_size = batch_size
+        self.max_depth = max_depth
+        self.flush_interval = flush_interval
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self._stored = 0
+        self._retry_at = 0.0
+        self._failures = 0
+        self._sent_window = deque()  # (monotonic time, events sent)
+
+        self.enqueued_total = 0
+        self.sent_total = 0
+        self.rejected_total = 0
+        self.dropped_total = 0
+        self.last_error = None
+        self.last_success_at = None
+
+    def put(self, event):
+        """Queue an event for delivery. Never blocks on I/O."""
+        with self._lock:
+            if len(self._pending) >= self.max_depth:
+                self._pending.popleft()
+                self.dropped_total += 1
+            self._pending.append(event)
+            self.enqueued_total += 1
+        self._wakeup.set()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f'{self.name}-sender', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            pending = len(self._pending)
+            window = list(self._sent_window)
+        recent = [n for t, n in window if now - t <= 60]
+        return {
+            'name': self.name,
+            'depth': self._stored + pending,
+            'stored': self._stored,
+            'buffered': pending,
+            'enqueued_total': self.enqueued_total,
+            'sent_total': self.sent_total,
+            'rejected_total': self.rejected_total,
+            'dropped_total': self.dropped_total,
+            'drain_rate_per_sec': round(sum(recent) / 60.0, 3),
+            'consecutive_failures': self._failures,
+            'retry_in_sec': round(max(0.0, self._retry_at - now), 3),
+            'last_error': self.last_error,
+            'last_success_at': self.last_success_at
+        }
+
+    # --- sender thread -------------------------------------------------
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS outbound_events ('
+            'seq INTEGER PRIMARY KEY AUTOINCREMENT, '
+            'event_id TEXT NOT NULL, '
+            'payload TEXT NOT NULL)'
+        )
+        conn.commit()
+        return conn
+
+    def _run(self):
+        try:
+            conn = self._connect()
+        except Exception as e:
+            logger.error(f"Outbound queue '{self.name}' could not open {self.path}: {e}")
+            return
+        self._stored = conn.execute('SELECT COUNT(*) FROM outbound_events').fetchone()[0]
+        if self._stored:
+            logger.info(f"Outbound queue '{self.name}' resuming with {self._stored} stored events")
+
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self._persist_pending(conn)
+                if time.monotonic() >= self._retry_at:
+                    self._drain(conn)
+            except Exception as e:
+                logger.error(f"Outbound queue '{self.name}' error: {e}")
+        try:
+            self._persist_pending(conn)
+        finally:
+            conn.close()
+
+    def _persist_pending(self, conn):
+        with self._lock:
+            if not self._pending:
+                return
+            batch = list(self._pending)
+            self._pending.clear()
+        conn.executemany(
+            'INSERT INTO outbound_events (event_id, payload) VALUES (?, ?)',
+            [(str(e.get('id')), json.dumps(e)) for e in batch]
+        )
+        self._stored += len(batch)
+        overflow = self._stored - self.max_depth
+        if overflow > 0:
+            # Drop the oldest events rather than growing without bound
+            conn.execute(
+                'DELETE FROM outbound_events WHERE seq IN '
+                '(SELECT seq FROM outbound_events ORDER BY seq LIMIT ?)',
+                (overflow,)
+            )
+            self._stored -= overflow
+            self.dropped_total += overflow
+            logger.warning(f"Outbound queue '{self.name}' full, dropped {overflow} oldest events")
+        conn.commit()
+
+    def _drain(self, conn):
+        while self._stored and not self._stop.is_set():
+            rows = conn.execute(
+                'SELECT seq, event_id, payload FROM outbound_events ORDER BY seq LIMIT ?',
+                (self.batch_size,)
+            ).fetchall()
+            if not rows:
+                self._stored = 0
+                return
+            events = [json.loads(payload) for _, _, payload in rows]
+            try:
+                result = self.send_batch(events)
+            except Exception as e:
+                self._schedule_retry(str(e))
+                return
+
+            accepted = set(map(str, result.get('accepted', [])))
+            rejected = {str(r.get('id')) for r in result.get('rejected', []) if isinstance(r, dict)}
+            done = [(seq,) for seq, event_id, _ in rows if event_id in accepted or event_id in rejected]
+            sent = sum(1 for _, event_id, _ in rows if event_id in accepted)
+            if not done:
+                self._schedule_retry('central server accepted no events from batch')
+                return
+            conn.executemany('DELETE FROM outbound_events WHERE seq = ?', done)
+            conn.commit()
+            self._stored -= len(done)
+
+            self.sent_total += sent
+            self.rejected_total += len(done) - sent
+            if len(done) > sent:
+                logger.warning(f"Outbound queue '{self.name}': central server rejected {len(done) - sent} events")
+            self.last_success_at = time.time()
+            self._failures = 0
+            self._retry_at = 0.0
+            now = time.monotonic()
+            with self._lock:
+                self._sent_window.append((now, sent))
+                while self._sent_window and now - self._sent_window[0][0] > 60:
+                    self._sent_window.popleft()
+            # Pick up anything produced while we were sending
+            self._persist_pending(conn)
+
+    def _schedule_retry(self, error):
+        self._failures += 1
+        delay = min(self.max_backoff, self.base_backoff * (2 ** (self._failures - 1)))
+        delay *= random.uniform(0.8, 1.2)
+        self._retry_at = time.monotonic() + delay
+        self.last_error = error
+        logger.warning(
+            f"Outbound queue '{self.name}' send failed ({self._failures} in a row), "
+            f"retrying in {delay:.1f}s: {error}"
+        )
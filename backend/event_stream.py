@@ -0,0 +1,82 @@
+"""
+In-memory event feed with Server-Sent Events support.
+
+Events get monotonically increasing ids and are kept in a bounded ring
+buffer. Stream subscribers block until an event newer than the last id they
+saw is published, so reconnecting clients (which send ``Last-Event-ID``)
+resume without gaps as long as the missed events are still buffered.
+Clients whose id is no longer buffered, or is ahead of the feed because the
+process restarted and ids began again at 1, get a ``resync`` event telling
+them to refetch the buffered events.
+"""
+
+import json
+import threading
+from collections import deque
+
+
+class EventFeed:
+    def __init__(self, maxlen=100):
+        self._events = deque(maxlen=maxlen)
+        self._cond = threading.Condition()
+        self._last_id = 0
+
+    @property
+    def last_id(self):
+        return self._last_id
+
+    def publish(self, event):
+        """Assign the next id to ``event`` (a dict), buffer it and wake subscribers."""
+        with self._cond:
+            self._last_id += 1
+            event['id'] = self._last_id
+            self._events.append(event)
+            self._cond.notify_all()
+        return event
+
+    def snapshot(self):
+        with self._cond:
+            return list(self._events)
+
+    def clear(self):
+        """Drop buffered events; ids keep increasing so clients never see a reused id."""
+        with self._cond:
+            self._events.clear()
+
+    def since(self, last_id):
+        """Buffered events newer than ``last_id``; None if ``last_id`` fell out of the buffer."""
+        with self._cond:
+            return self._since(last_id)
+
+    def _since(self, last_id):
+        if self._events and last_id < self._events[0]['id'] - 1:
+            return None
+        return [e for e in self._events if e['id'] > last_id]
+
+    def wait(self, last_id, timeout):
+        """Like ``since`` but blocks up to ``timeout`` seconds for a new event."""
+        with self._cond:
+            if self._last_id <= last_id:
+                self._cond.wait(timeout)
+            return self._since(last_id)
+
+    def stream(self, last_id=None, event_type='message', keepalive=15):
+        """Generator of SSE-formatted chunks starting after ``last_id`` (default: now)."""
+        stale = last_id is not None and last_id > self._last_id  # Id from before a restart
+        if last_id is None or stale:
+            last_id = self._last_id
+        yield 'retry: 3000\n\n'
+        if stale:
+            yield f'id: {last_id}\nevent: resync\ndata: {{}}\n\n'
+        while True:
+            events = self.wait(last_id, keepalive)
+            if events is None:
+                last_id = self._last_id
+                yield f'id: {last_id}\nevent: resync\ndata: {{}}\n\n'
+                continue
+            if not events:
+                yield ': keepalive\n\n'
+                continue
+            for event in events:
+                last_id = event['id']
+                yield f"id: {event['id']}\nevent: {event_type}\ndata: {json.dumps(event)}\n\n"
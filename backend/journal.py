@@ -0,0 +1,289 @@
+"""
+Append-only structured event journal for the Factory IoT edge backend.
+
+Records (motion detections, relay actions, sync outcomes) are JSON objects
+written one per line to segment files ``journal-<seq>.jsonl``. A new segment
+is started once the current one reaches ``segment_bytes`` and the oldest
+segments beyond ``max_segments`` are deleted, so disk use stays bounded.
+
+``record()`` only appends to an in-memory queue; a writer thread does the
+file I/O. Every record has ``ts`` (UNIX seconds, UTC) and ``kind``. The time
+range of each segment is kept in memory so ``query()`` only opens segments
+that can contain matching records, and reads them backwards in blocks so a
+query stops reading once it has ``limit`` records. Queries by sensor or relay
+id go through an in-memory index of the newest record offsets per id, so a
+quiet sensor's history costs one seek per record instead of a segment scan.
+"""
+
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger('motion_sensor')
+
+SEGMENT_RE = re.compile(r'^journal-(\d+)\.jsonl$')
+
+
+class EventJournal:
+    def __init__(self, directory, segment_bytes=1024 * 1024, max_segments=32, max_pending=10000,
+                 block_size=8192, max_offsets_per_id=2000):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_segments = max_segments
+        self.block_size = block_size
+        self.max_offsets_per_id = max_offsets_per_id
+        self._index = {}  # ('sensor_id' | 'relay_id', id) -> deque of (segment seq, offset), newest last
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()  # guards _segments and the current file
+        self._segments = []  # [{'seq', 'path', 'first_ts', 'last_ts', 'size'}], oldest first
+        self._file = None
+        self._thread = None
+        self.written_total = 0
+        self.dropped_total = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_segments()
+
+    # Writing
+
+    def record(self, kind, ts=None, **fields):
+        """Queue a record for the writer thread; never blocks the caller."""
+        entry = {'ts': round(ts if ts is not None else time.time(), 6), 'kind': kind}
+        entry.update(fields)
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped_total += 1
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='event-journal', daemon=True)
+            self._thread.start()
+        return self
+
+    def flush(self, timeout=5.0):
+        """Block until records queued so far are written (or ``timeout``); returns True if drained."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < 500:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except Exception as e:
+                logger.error(f"Event journal write failed, {len(batch)} records lost: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch):
+        with self._lock:
+            for entry in batch:
+                segment = self._current_segment()
+                line = (json.dumps(entry, separators=(',', ':')) + '\n').encode('utf-8')
+                self._file.write(line)
+                self._index_entry(entry, segment['seq'], segment['size'])
+                segment['size'] += len(line)
+                if segment['first_ts'] is None:
+                    segment['first_ts'] = entry['ts']
+                segment['last_ts'] = max(segment['last_ts'] or entry['ts'], entry['ts'])
+                self.written_total += 1
+            self._file.flush()
+
+    def _current_segment(self):
+        """Return the segment to append to, rotating when it is full. Caller holds the lock."""
+        segment = self._segments[-1] if self._segments else None
+        if segment is None or segment['size'] >= self.segment_bytes:
+            if self._file:
+                self._file.close()
+                self._file = None
+            seq = segment['seq'] + 1 if segment else 1
+            segment = {
+                'seq': seq,
+                'path': os.path.join(self.directory, f'journal-{seq:08d}.jsonl'),
+                'first_ts': None,
+                'last_ts': None,
+                'size': 0
+            }
+            self._segments.append(segment)
+            while len(self._segments) > self.max_segments:
+                oldest = self._segments.pop(0)
+                try:
+                    os.remove(oldest['path'])
+                except OSError as e:
+                    logger.warning(f"Could not remove journal segment {oldest['path']}: {e}")
+        if self._file is None:
+            self._file = open(segment['path'], 'ab')
+        return segment
+
+    def _index_entry(self, entry, seq, offset):
+        """Remember where ``entry`` starts for sensor/relay id lookups. Caller holds the lock."""
+        for field in ('sensor_id', 'relay_id'):
+            if entry.get(field) is None:
+                continue
+            key = (field, str(entry[field]))
+            offsets = self._index.get(key)
+            if offsets is None:
+                offsets = self._index[key] = deque(maxlen=self.max_offsets_per_id)
+            offsets.append((seq, offset))
+
+    # Reading
+
+    def _load_segments(self):
+        """Rebuild segment metadata and the id index from disk (one scan at start-up)."""
+        names = sorted(
+            (int(match.group(1)), name)
+            for match, name in ((SEGMENT_RE.match(name), name) for name in os.listdir(self.directory))
+            if match
+        )
+        for seq, name in names:
+            path = os.path.join(self.directory, name)
+            first_ts = last_ts = None
+            offset = 0
+            with open(path, 'rb') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        offset += len(line)
+                        continue  # Torn write at the end of a segment after a crash
+                    if first_ts is None:
+                        first_ts = entry['ts']
+                    last_ts = max(last_ts or entry['ts'], entry['ts'])
+                    self._index_entry(entry, seq, offset)
+                    offset += len(line)
+            self._segments.append({
+                'seq': seq,
+                'path': path,
+                'first_ts': first_ts,
+                'last_ts': last_ts,
+                'size': offset
+            })
+
+    def _read_backwards(self, f, end):
+        """Yield records from ``f`` ending before byte ``end``, newest first, reading in blocks."""
+        position, remainder = end, b''
+        while position > 0:
+            step = min(self.block_size, position)
+            position -= step
+            f.seek(position)
+            lines = (f.read(step) + remainder).split(b'\n')
+            remainder = lines.pop(0)  # May continue in the previous block
+            for line in reversed(lines):
+                if line:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+        if remainder:
+            try:
+                yield json.loads(remainder)
+            except ValueError:
+                pass
+
+    def query(self, start=None, end=None, kind=None, sensor_id=None, relay_id=None, limit=100):
+        """Newest-first records with ``start <= ts < end`` matching the given filters.
+
+        ``start``/``end`` are UNIX timestamps; ``kind`` is a kind or a list of
+        kinds. Ids are compared as strings.
+        """
+        kinds = {kind} if isinstance(kind, str) else set(kind or ())
+        sensor_id = str(sensor_id) if sensor_id is not None else None
+        relay_id = str(relay_id) if relay_id is not None else None
+
+        def matches(entry):
+            ts = entry.get('ts', 0)
+            return not (
+                (start is not None and ts < start)
+                or (end is not None and ts >= end)
+                or (kinds and entry.get('kind') not in kinds)
+                or (sensor_id is not None and str(entry.get('sensor_id')) != sensor_id)
+                or (relay_id is not None and str(entry.get('relay_id')) != relay_id)
+            )
+
+        def in_range(segment):
+            return not (
+                segment['first_ts'] is None
+                or (start is not None and segment['last_ts'] < start)
+                or (end is not None and segment['first_ts'] >= end)
+            )
+
+        key = ('sensor_id', sensor_id) if sensor_id is not None else ('relay_id', relay_id) if relay_id is not None else None
+        with self._lock:
+            if self._file:
+                self._file.flush()
+            segments = [dict(s) for s in self._segments]
+            offsets = list(self._index.get(key, ())) if key else None
+            complete = key is None or len(offsets) < self.max_offsets_per_id
+        by_seq = {s['seq']: s for s in segments}
+        results = []
+
+        if key is not None:
+            # Seek straight to the indexed records for this id
+            handles = {}
+            try:
+                for seq, offset in reversed(offsets):
+                    segment = by_seq.get(seq)
+                    if segment is None or not in_range(segment):
+                        continue
+                    f = handles.get(seq)
+                    if f is None:
+                        f = handles[seq] = open(segment['path'], 'rb')
+                    f.seek(offset)
+                    try:
+                        entry = json.loads(f.readline())
+                    except ValueError:
+                        continue
+                    if matches(entry):
+                        results.append(entry)
+                        if limit and len(results) >= limit:
+                            return results
+            finally:
+                for f in handles.values():
+                    f.close()
+            if complete or not offsets:
+                return results
+            # The index only holds the newest offsets; scan what lies before them
+            oldest_seq, oldest_offset = offsets[0]
+            segments = [dict(s, size=oldest_offset) if s['seq'] == oldest_seq else s
+                        for s in segments if s['seq'] <= oldest_seq]
+
+        for segment in reversed(segments):
+            if not in_range(segment):
+                continue
+            try:
+                with open(segment['path'], 'rb') as f:
+                    for entry in self._read_backwards(f, segment['size']):
+                        if matches(entry):
+                            results.append(entry)
+                            if limit and len(results) >= limit:
+                                return results
+            except FileNotFoundError:
+                continue  # Rotated away while we were reading
+        return results
+
+    def stats(self):
+        with self._lock:
+            return {
+                'segments': len(self._segments),
+                'indexed_ids': len(self._index),
+                'bytes': sum(s['size'] for s in self._segments),
+                'oldest_ts': next((s['first_ts'] for s in self._segments if s['first_ts'] is not None), None),
+                'pending': self._queue.qsize(),
+                'written_total': self.written_total,
+                'dropped_total': self.dropped_total
+            }
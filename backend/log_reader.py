@@ -0,0 +1,89 @@
+"""
+Tail and per-sensor queries over the append-only motion sensor log.
+
+``tail`` reads backwards from the end of the file in fixed-size blocks, so it
+only touches the bytes of the lines it returns. ``sensor_tail`` uses an index
+of line offsets per sensor id that is extended incrementally: each call only
+scans the bytes appended since the previous call. The index is rebuilt if the
+file is truncated or replaced (e.g. by log rotation).
+"""
+
+import os
+import re
+import threading
+from collections import deque
+
+SENSOR_RE = re.compile(rb'sensor (\w+)', re.IGNORECASE)
+
+
+class LogReader:
+    def __init__(self, path, block_size=8192, max_offsets_per_sensor=1000):
+        self.path = path
+        self.block_size = block_size
+        self.max_offsets_per_sensor = max_offsets_per_sensor
+        self._lock = threading.Lock()
+        self._reset(None)
+
+    def _reset(self, inode):
+        self._inode = inode
+        self._indexed_to = 0  # byte offset just past the last complete line indexed
+        self._line_count = 0
+        self._sensor_offsets = {}  # sensor id -> deque of line start offsets (newest last)
+        self._sensor_counts = {}  # sensor id -> total matching lines
+
+    def _update_index(self, f):
+        """Index complete lines appended since the last call. Caller holds the lock."""
+        st = os.fstat(f.fileno())
+        if st.st_ino != self._inode or st.st_size < self._indexed_to:
+            self._reset(st.st_ino)
+        if st.st_size == self._indexed_to:
+            return
+        f.seek(self._indexed_to)
+        offset = self._indexed_to
+        for line in f:
+            if not line.endswith(b'\n'):
+                break  # Partial line still being written; index it next time
+            self._line_count += 1
+            for sensor_id in {m.lower() for m in SENSOR_RE.findall(line)}:
+                sensor_id = sensor_id.decode('ascii', 'replace')
+                offsets = self._sensor_offsets.get(sensor_id)
+                if offsets is None:
+                    offsets = self._sensor_offsets[sensor_id] = deque(maxlen=self.max_offsets_per_sensor)
+                offsets.append(offset)
+                self._sensor_counts[sensor_id] = self._sensor_counts.get(sensor_id, 0) + 1
+            offset += len(line)
+        self._indexed_to = offset
+
+    def tail(self, n):
+        """Return (last ``n`` lines, total line count); raises FileNotFoundError."""
+        with self._lock, open(self.path, 'rb') as f:
+            self._update_index(f)
+            if n <= 0:
+                return [], self._line_count
+            end = f.seek(0, os.SEEK_END)
+            position, chunks, newlines = end, [], 0
+            # A trailing newline ends the last line rather than starting a new one
+            while position > 0 and newlines <= n:
+                step = min(self.block_size, position)
+                position -= step
+                f.seek(position)
+                chunk = f.read(step)
+                chunks.append(chunk)
+                newlines += chunk.count(b'\n')
+            data = b''.join(reversed(chunks))
+            lines = data.splitlines(keepends=True)
+            if position > 0:
+                lines = lines[1:]  # First line is cut off by the block boundary
+            return [line.decode('utf-8', 'replace') for line in lines[-n:]], self._line_count
+
+    def sensor_tail(self, sensor_id, n):
+        """Return (last ``n`` lines mentioning ``sensor {sensor_id}``, total matching lines)."""
+        sensor_id = str(sensor_id).lower()
+        with self._lock, open(self.path, 'rb') as f:
+            self._update_index(f)
+            offsets = list(self._sensor_offsets.get(sensor_id, ()))[-n:] if n > 0 else []
+            lines = []
+            for offset in offsets:
+                f.seek(offset)
+                lines.append(f.readline().decode('utf-8', 'replace'))
+            return lines, self._sensor_counts.get(sensor_id, 0)
@@ -0,0 +1,102 @@
+"""
+Per-sensor motion debouncing driven by the central sensor configuration.
+
+``delay_time`` (seconds) and ``trigger_mode`` mirror the HC-SR501 jumper
+settings:
+
+- ``single``: the first edge is reported, then every edge within
+  ``delay_time`` seconds of it is suppressed (fixed window).
+- ``repeat``: edges keep extending the window while motion continues; a new
+  event is reported only after ``delay_time`` seconds without any edge.
+
+Suppressed edges are counted per sensor, and the number coalesced into an
+event is reported with the next accepted event. ``allow()`` is a lock plus
+a few comparisons, so it can run first in the GPIO callback and keep
+suppressed edges away from logging, alerts and the outbound queue.
+"""
+
+import threading
+import time
+
+DEFAULT_DELAY_TIME = 3
+TRIGGER_MODES = ('single', 'repeat')
+
+# gpiozero MotionSensor settings per sensitivity. 'medium' (the central
+# default, also used when unset) keeps gpiozero's own defaults (queue_len=1,
+# sample_rate=10, threshold=0.5). 'low' smooths: a longer queue and higher
+# threshold require the PIR output to stay high longer before it counts.
+# 'high' samples ten times as often, so pulses shorter than 100 ms count too.
+SENSITIVITY_SETTINGS = {
+    'low': {'queue_len': 5, 'threshold': 0.8},
+    'medium': {},
+    'high': {'sample_rate': 100},
+}
+
+
+def sensitivity_settings(sensitivity):
+    return SENSITIVITY_SETTINGS.get(str(sensitivity or 'medium').lower(), SENSITIVITY_SETTINGS['medium'])
+
+
+class MotionDebouncer:
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._sensors = {}  # sensor id (str) -> state dict
+
+    def configure(self, sensor_id, delay_time=None, trigger_mode=None):
+        """Set or update a sensor's window; counters survive reconfiguration."""
+        try:
+            delay = max(0.0, float(delay_time if delay_time is not None else DEFAULT_DELAY_TIME))
+        except (TypeError, ValueError):
+            delay = DEFAULT_DELAY_TIME
+        mode = trigger_mode if trigger_mode in TRIGGER_MODES else 'single'
+        with self._lock:
+            state = self._sensors.setdefault(str(sensor_id), {
+                'window_end': None,
+                'accepted': 0,
+                'suppressed': 0,
+                'pending_suppressed': 0
+            })
+            state['delay_time'] = delay
+            state['trigger_mode'] = mode
+
+    def remove(self, sensor_id):
+        with self._lock:
+            self._sensors.pop(str(sensor_id), None)
+
+    def allow(self, sensor_id):
+        """Return (allowed, coalesced) for a motion edge on ``sensor_id``.
+
+        ``coalesced`` is the number of edges suppressed since the previous
+        accepted event. Unknown sensors are always allowed.
+        """
+        now = self._clock()
+        with self._lock:
+            state = self._sensors.get(str(sensor_id))
+            if state is None:
+                return True, 0
+            window_end = state['window_end']
+            if window_end is not None and now < window_end:
+                state['suppressed'] += 1
+                state['pending_suppressed'] += 1
+                if state['trigger_mode'] == 'repeat':
+                    state['window_end'] = now + state['delay_time']
+                return False, 0
+            coalesced = state['pending_suppressed']
+            state['pending_suppressed'] = 0
+            state['accepted'] += 1
+            state['window_end'] = now + state['delay_time']
+            return True, coalesced
+
+    def stats(self):
+        now = self._clock()
+        with self._lock:
+            return {
+                sensor_id: {
+                    'delay_time': s['delay_time'],
+                    'trigger_mode': s['trigger_mode'],
+                    'accepted': s['accepted'],
+                    'suppressed': s['suppressed'],
+                    'in_window': s['window_end'] is not None and now < s['window_end']
+                } for sensor_id, s in self._sensors.items()
+            }
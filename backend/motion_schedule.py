@@ -0,0 +1,155 @@
+"""
+Compiled, timezone-aware motion sensor schedules.
+
+``ScheduleRegistry.load`` turns each sensor's scheduling fields (start/end
+time, weekday/weekend monitoring, timezone) into a sorted list of closed
+intervals over the sensor's local week, measured in microseconds from Monday
+00:00. Checking a motion event is then a dict lookup by sensor id, one
+``datetime.now(tz)`` and a ``bisect``; nothing is parsed on the hot path.
+
+Semantics match the original per-event check: the weekday/weekend flag
+applies to the day the motion happens on, ``start <= time <= end`` is
+inclusive, and ``start > end`` is an overnight range (e.g. 22:00-06:00).
+
+Run ``python motion_schedule.py`` for a microbenchmark against the old
+per-event parsing.
+"""
+
+import logging
+from bisect import bisect_right
+from datetime import datetime, time as dt_time, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+logger = logging.getLogger('motion_sensor')
+
+DAY_US = 86400 * 1000000
+
+
+def sensor_key(sensor_id):
+    """Normalize a sensor id (int from config, str from URLs) to one dict key."""
+    try:
+        return int(sensor_id)
+    except (TypeError, ValueError):
+        return str(sensor_id)
+
+
+def _parse_time(value):
+    if isinstance(value, dt_time):
+        return value
+    if not value:
+        return None
+    return datetime.strptime(value[:5], '%H:%M').time()
+
+
+def _time_us(t):
+    return ((t.hour * 60 + t.minute) * 60 + t.second) * 1000000 + t.microsecond
+
+
+def _load_timezone(name, sensor_id):
+    try:
+        return ZoneInfo(name or 'UTC')
+    except (ZoneInfoNotFoundError, ValueError) as e:
+        logger.warning(f"Unknown timezone {name!r} for sensor {sensor_id}, using UTC: {e}")
+        return timezone.utc
+
+
+class CompiledSchedule:
+    """One sensor's config plus its precomputed weekly allowed intervals."""
+
+    __slots__ = ('config', 'tz', 'always', 'starts', 'ends')
+
+    def __init__(self, config):
+        self.config = config
+        self.tz = _load_timezone(config.get('timezone'), config.get('id'))
+        self.always = not config.get('enable_scheduling', False)
+        self.starts, self.ends = [], []
+        if self.always:
+            return
+        start = _parse_time(config.get('start_time'))
+        end = _parse_time(config.get('end_time'))
+        if start and end:
+            start_us, end_us = _time_us(start), _time_us(end)
+            if start_us > end_us:
+                day_ranges = [(0, end_us), (start_us, DAY_US - 1)]
+            else:
+                day_ranges = [(start_us, end_us)]
+        else:
+            day_ranges = [(0, DAY_US - 1)]
+        for weekday in range(7):
+            is_weekend = weekday >= 5
+            if not config.get('weekend_monitoring' if is_weekend else 'weekday_monitoring', True):
+                continue
+            for lo, hi in day_ranges:
+                lo, hi = weekday * DAY_US + lo, weekday * DAY_US + hi
+                if self.ends and lo <= self.ends[-1] + 1:
+                    self.ends[-1] = max(self.ends[-1], hi)  # Merge touching windows
+                else:
+                    self.starts.append(lo)
+                    self.ends.append(hi)
+
+    def is_allowed(self, now=None):
+        """True if motion at ``now`` (aware datetime, default: current time) is in schedule."""
+        if self.always:
+            return True
+        local = now.astimezone(self.tz) if now is not None else datetime.now(self.tz)
+        week_us = local.weekday() * DAY_US + _time_us(local.time())
+        index = bisect_right(self.starts, week_us) - 1
+        return index >= 0 and week_us <= self.ends[index]
+
+
+class ScheduleRegistry:
+    """Sensor id -> CompiledSchedule, rebuilt once per motion sensor config load."""
+
+    def __init__(self):
+        self._schedules = {}
+
+    def load(self, sensor_defs):
+        schedules = {}
+        for config in sensor_defs:
+            try:
+                schedules[sensor_key(config['id'])] = CompiledSchedule(config)
+            except Exception as e:
+                logger.error(f"Invalid schedule for motion sensor {config.get('id')}: {e}")
+        self._schedules = schedules  # Swapped in one assignment; readers never see a partial registry
+
+    def get(self, sensor_id):
+        return self._schedules.get(sensor_key(sensor_id))
+
+    def __len__(self):
+        return len(self._schedules)
+
+
+if __name__ == '__main__':
+    import timeit
+
+    def legacy_is_allowed(sensor_defs, sensor_id):
+        """The per-event check this module replaced (linear lookup + strptime)."""
+        sensor_config = next((s for s in sensor_defs if s['id'] == sensor_id), None)
+        now = datetime.now()
+        current_time = now.time()
+        is_weekend = now.weekday() >= 5
+        if is_weekend and not sensor_config.get('weekend_monitoring', True):
+            return False
+        if not is_weekend and not sensor_config.get('weekday_monitoring', True):
+            return False
+        start_time = datetime.strptime(sensor_config['start_time'], '%H:%M').time()
+        end_time = datetime.strptime(sensor_config['end_time'], '%H:%M').time()
+        if start_time > end_time:
+            return current_time >= start_time or current_time <= end_time
+        return start_time <= current_time <= end_time
+
+    defs = [{
+        'id': i, 'enable_scheduling': True, 'start_time': '22:00', 'end_time': '06:00',
+        'timezone': 'Europe/Berlin', 'weekday_monitoring': True, 'weekend_monitoring': False
+    } for i in range(50)]
+    registry = ScheduleRegistry()
+    registry.load(defs)
+    target = defs[-1]
+    runs = 20000
+    legacy = timeit.timeit(lambda: legacy_is_allowed(defs, target['id']), number=runs)
+    compiled = timeit.timeit(lambda: registry.get(target['id']).is_allowed(), number=runs)
+    compile_time = timeit.timeit(lambda: registry.load(defs), number=100) / 100
+    print(f"{len(defs)} sensors, {runs} checks of the last sensor")
+    print(f"legacy:   {legacy / runs * 1e6:8.2f} us/check")
+    print(f"compiled: {compiled / runs * 1e6:8.2f} us/check ({legacy / compiled:.1f}x faster)")
+    print(f"registry build: {compile_time * 1e3:.2f} ms per config load")
@@ -0,0 +1,108 @@
+"""
+Coalescing relay state reporter for the Factory IoT edge backend.
+
+Relay switches call ``report()``, which only records the latest state per
+relay and wakes the sender thread. The sender waits a short coalescing delay,
+then sends every pending state in one request, so rapid toggles collapse into
+a single update carrying the final state. Each state carries the id of the
+newest central relay command the relay had applied when it switched, which
+lets the central server ignore reports overtaken by a newer dashboard
+command. On failure the states are kept (unless a newer one arrived in
+the meantime) and retried with exponential backoff.
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger('motion_sensor')
+
+
+class RelayStateReporter:
+    """Latest-state-per-relay buffer drained by a background sender thread.
+
+    ``send_states`` receives a list of {id, status, command_id} dicts and must
+    raise on failure; any exception is retried.
+    """
+
+    def __init__(self, send_states, coalesce_delay=0.2, base_backoff=1.0, max_backoff=60.0):
+        self.send_states = send_states
+        self.coalesce_delay = coalesce_delay
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self._pending = {}  # relay id (str) -> {'id', 'status', 'command_id'}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._failures = 0
+
+        self.reported_total = 0
+        self.coalesced_total = 0
+        self.sent_total = 0
+        self.requests_total = 0
+        self.last_error = None
+        self.last_success_at = None
+
+    def report(self, relay_id, status, command_id=None):
+        """Record a relay's new state for delivery. Never blocks on I/O."""
+        with self._lock:
+            if str(relay_id) in self._pending:
+                self.coalesced_total += 1
+            self._pending[str(relay_id)] = {
+                'id': int(relay_id),
+                'status': bool(status),
+                'command_id': command_id
+            }
+            self.reported_total += 1
+        self._wakeup.set()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name='relay-reporter', daemon=True)
+        self._thread.start()
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            'pending': pending,
+            'reported_total': self.reported_total,
+            'coalesced_total': self.coalesced_total,
+            'sent_total': self.sent_total,
+            'requests_total': self.requests_total,
+            'consecutive_failures': self._failures,
+            'last_error': self.last_error,
+            'last_success_at': self.last_success_at
+        }
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            time.sleep(self.coalesce_delay)  # Let a burst of toggles settle into one request
+            self._wakeup.clear()
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                continue
+            try:
+                self.requests_total += 1
+                self.send_states(list(batch.values()))
+            except Exception as e:
+                self._requeue(batch)
+                self._failures += 1
+                self.last_error = str(e)
+                delay = min(self.max_backoff, self.base_backoff * (2 ** (self._failures - 1)))
+                logger.warning(f"Relay state report failed ({e}), retrying {len(batch)} states in {delay:.0f}s")
+                time.sleep(delay)
+                self._wakeup.set()
+                continue
+            self._failures = 0
+            self.sent_total += len(batch)
+            self.last_success_at = time.time()
+
+    def _requeue(self, batch):
+        with self._lock:
+            for relay_id, state in batch.items():
+                self._pending.setdefault(relay_id, state)  # A newer state reported meanwhile wins
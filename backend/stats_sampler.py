@@ -0,0 +1,150 @@
+"""
+Background system statistics sampler for the Factory IoT edge backend.
+
+A daemon thread collects CPU, memory, disk, network and temperature figures
+every ``interval`` seconds. The latest sample is served as-is by
+``/api/system/stats`` and a compact copy of each sample goes into a fixed-size
+ring buffer that ``history()`` downsamples for charts. Requests never call
+psutil themselves, so they return instantly and concurrent clients do not
+multiply the sampling cost.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import psutil
+
+logger = logging.getLogger('motion_sensor')
+
+
+def read_temperature():
+    """First available temperature sensor reading, or None."""
+    try:
+        temp_data = psutil.sensors_temperatures()
+    except Exception:
+        return None
+    for sensor_name, entries in (temp_data or {}).items():
+        if entries:
+            return {
+                'sensor': sensor_name,
+                'label': entries[0].label,
+                'current': entries[0].current,
+                'high': entries[0].high,
+                'critical': entries[0].critical
+            }
+    return None
+
+
+class SystemStatsSampler:
+    def __init__(self, interval=5.0, history_size=720, disk_path='/'):
+        self.interval = interval
+        self.disk_path = disk_path
+        self._history = deque(maxlen=history_size)  # (ts, cpu%, mem%, disk%, temp, bytes_sent, bytes_recv)
+        self._lock = threading.Lock()
+        self._latest = None
+        self._thread = None
+        self._cpu_count = psutil.cpu_count()
+        psutil.cpu_percent(interval=None)  # Prime the counter; the next call reports usage since now
+
+    def sample(self):
+        """Collect one sample (each psutil call once) and record it."""
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage(self.disk_path)
+        net = psutil.net_io_counters()
+        freq = psutil.cpu_freq()
+        temperature = read_temperature()
+        now = time.time()
+        stats = {
+            "cpu": {
+                "percent": psutil.cpu_percent(interval=None),
+                "count": self._cpu_count,
+                "frequency": freq._asdict() if freq else None
+            },
+            "memory": {
+                "total": memory.total,
+                "available": memory.available,
+                "percent": memory.percent,
+                "used": memory.used
+            },
+            "disk": {
+                "total": disk.total,
+                "used": disk.used,
+                "free": disk.free,
+                "percent": disk.percent
+            },
+            "network": {
+                "bytes_sent": net.bytes_sent,
+                "bytes_recv": net.bytes_recv
+            },
+            "temperature": temperature,
+            "timestamp": datetime.fromtimestamp(now).isoformat()
+        }
+        point = (now, stats['cpu']['percent'], memory.percent, disk.percent,
+                 temperature['current'] if temperature else None, net.bytes_sent, net.bytes_recv)
+        with self._lock:
+            self._latest = stats
+            self._history.append(point)
+        return stats
+
+    def latest(self):
+        """Most recent sample; samples synchronously if the thread has not produced one yet."""
+        with self._lock:
+            latest = self._latest
+        return latest if latest is not None else self.sample()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='system-stats', daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        # The first sample waits one interval so its CPU figure covers a full
+        # interval since priming rather than the few ms after start-up
+        next_at = time.monotonic() + self.interval
+        while True:
+            time.sleep(max(0.0, next_at - time.monotonic()))
+            next_at = time.monotonic() + self.interval
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"System stats sampling failed: {e}")
+
+    def history(self, seconds=None, points=120):
+        """Samples from the last ``seconds`` (default: all), averaged down to at most ``points``.
+
+        Each returned point has the mean CPU/memory/disk/temperature of its
+        bucket, the peak CPU, and network throughput in bytes per second.
+        """
+        with self._lock:
+            samples = list(self._history)
+        if seconds is not None and samples:
+            cutoff = samples[-1][0] - seconds
+            samples = [s for s in samples if s[0] >= cutoff]
+        if not samples:
+            return []
+        size = max(1, -(-len(samples) // max(1, points)))
+        series = []
+        previous = None
+        for i in range(0, len(samples), size):
+            bucket = samples[i:i + size]
+            temps = [s[4] for s in bucket if s[4] is not None]
+            first = previous or bucket[0]
+            last = bucket[-1]
+            elapsed = last[0] - first[0]
+            series.append({
+                'timestamp': datetime.fromtimestamp(last[0]).isoformat(),
+                'cpu_percent': round(sum(s[1] for s in bucket) / len(bucket), 1),
+                'cpu_percent_max': max(s[1] for s in bucket),
+                'memory_percent': round(sum(s[2] for s in bucket) / len(bucket), 1),
+                'disk_percent': round(sum(s[3] for s in bucket) / len(bucket), 1),
+                'temperature': round(sum(temps) / len(temps), 1) if temps else None,
+                'bytes_sent_per_sec': round((last[5] - first[5]) / elapsed, 1) if elapsed > 0 else None,
+                'bytes_recv_per_sec': round((last[6] - first[6]) / elapsed, 1) if elapsed > 0 else None,
+                'samples': len(bucket)
+            })
+            previous = last
+        return series
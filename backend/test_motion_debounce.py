@@ -0,0 +1,18 @@
+"""Sensitivity settings passed to gpiozero's MotionSensor."""
+
+from motion_debounce import SENSITIVITY_SETTINGS, sensitivity_settings
+
+
+def test_sensitivity_levels_differ():
+    levels = [sensitivity_settings(level) for level in ('low', 'medium', 'high')]
+    assert len({tuple(sorted(settings.items())) for settings in levels}) == 3
+
+
+def test_medium_and_unset_keep_gpiozero_defaults():
+    assert sensitivity_settings('medium') == {}
+    assert sensitivity_settings(None) == {}
+    assert sensitivity_settings('bogus') == {}
+
+
+def test_sensitivity_is_case_insensitive():
+    assert sensitivity_settings('HIGH') == SENSITIVITY_SETTINGS['high']
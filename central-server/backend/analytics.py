@@ -0,0 +1,153 @@
+"""
+Server-side motion analytics over the motion rollup tables.
+
+All aggregation happens in SQL over ``motion_rollups_hourly`` or
+``motion_rollups_daily`` (plus the few raw ``motion_logs`` rows not rolled up
+yet), so a request touches at most one row per sensor per bucket instead of
+one row per motion event. Only small, already-aggregated result sets are
+binned in Python.
+"""
+
+import re
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, union_all
+
+from models import MotionLog, MotionRollupHourly, MotionRollupDaily, MotionSensor, RollupWatermark
+from rollups import WATERMARK_NAME, hour_bucket, day_bucket, hour_of_day
+
+MAX_BUCKETS = 2000
+_BUCKET_RE = re.compile(r'^(\d+)([hd])$')
+
+
+def parse_bucket(value):
+    """Parse a bucket size like '1h', '6h', '1d' or '7d' into a timedelta."""
+    match = _BUCKET_RE.match(value or '')
+    if not match or int(match.group(1)) <= 0:
+        raise ValueError("bucket must look like '1h', '6h', '1d' or '7d'")
+    amount = int(match.group(1))
+    return timedelta(hours=amount) if match.group(2) == 'h' else timedelta(days=amount)
+
+
+def _source(session, granularity, start, end, device_id=None, motion_sensor_id=None):
+    """Subquery of (motion_sensor_id, bucket_start, motion_count) covering [start, end).
+
+    Rolled-up rows come from the rollup table; rows newer than the rollup
+    watermark are aggregated from motion_logs on the fly (a PK range scan).
+    """
+    dialect = session.bind.dialect.name
+    model = MotionRollupHourly if granularity == 'hour' else MotionRollupDaily
+    truncate = hour_bucket if granularity == 'hour' else day_bucket
+    watermark = session.query(RollupWatermark.last_id).filter_by(name=WATERMARK_NAME).scalar() or 0
+
+    rolled = select(
+        model.motion_sensor_id.label('motion_sensor_id'),
+        model.bucket_start.label('bucket_start'),
+        model.motion_count.label('motion_count')
+    ).where(model.bucket_start >= start, model.bucket_start < end)
+
+    bucket = truncate(MotionLog.motion_detected, dialect)
+    tail = select(
+        MotionLog.motion_sensor_id.label('motion_sensor_id'),
+        bucket.label('bucket_start'),
+        func.count().label('motion_count')
+    ).where(
+        MotionLog.id > watermark,
+        MotionLog.motion_sensor_id.isnot(None),
+        MotionLog.motion_detected >= start,
+        MotionLog.motion_detected < end
+    ).group_by(MotionLog.motion_sensor_id, bucket)
+
+    if device_id is not None:
+        rolled = rolled.where(model.device_id == device_id)
+        tail = tail.where(MotionLog.device_id == device_id)
+    if motion_sensor_id is not None:
+        rolled = rolled.where(model.motion_sensor_id == motion_sensor_id)
+        tail = tail.where(MotionLog.motion_sensor_id == motion_sensor_id)
+    return union_all(rolled, tail).subquery()
+
+
+def _as_datetime(value):
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def motion_analytics(session, start, end, bucket, device_id=None, motion_sensor_id=None, top=5):
+    """Histogram, peak hours, busiest and idle sensors for a device, a sensor or the fleet.
+
+    ``start``/``end`` are naive UTC datetimes; ``bucket`` is a timedelta that
+    is a whole number of hours. Day-multiple buckets are served from the daily
+    rollups and align to UTC midnight; others align to the hour.
+    """
+    daily = bucket % timedelta(days=1) == timedelta(0)
+    origin = start.replace(minute=0, second=0, microsecond=0)
+    if daily:
+        origin = origin.replace(hour=0)
+    bucket_count = -(-(end - origin) // bucket)
+    if bucket_count > MAX_BUCKETS:
+        raise ValueError(f'Range spans {bucket_count} buckets; at most {MAX_BUCKETS} are allowed')
+    range_end = origin + bucket * bucket_count
+
+    # Histogram: one row per source bucket, binned into the requested size
+    source = _source(session, 'day' if daily else 'hour', origin, range_end, device_id, motion_sensor_id)
+    histogram = [0] * bucket_count
+    for bucket_start, count in session.execute(
+        select(source.c.bucket_start, func.sum(source.c.motion_count)).group_by(source.c.bucket_start)
+    ):
+        index = (_as_datetime(bucket_start) - origin) // bucket
+        if 0 <= index < bucket_count:
+            histogram[index] += int(count)
+
+    # Totals per sensor drive both the busiest and the idle lists
+    totals = {
+        sensor_id: int(count) for sensor_id, count in session.execute(
+            select(source.c.motion_sensor_id, func.sum(source.c.motion_count)).group_by(source.c.motion_sensor_id)
+        )
+    }
+
+    # Peak hours need hourly resolution regardless of the histogram bucket
+    hourly = _source(session, 'hour', origin, range_end, device_id, motion_sensor_id)
+    hour = hour_of_day(hourly.c.bucket_start, session.bind.dialect.name).label('hour')
+    by_hour = [0] * 24
+    for hour_value, count in session.execute(
+        select(hour, func.sum(hourly.c.motion_count)).group_by(hour)
+    ):
+        by_hour[int(hour_value)] += int(count)
+
+    sensors_query = session.query(MotionSensor.id, MotionSensor.name, MotionSensor.device_id, MotionSensor.is_active)
+    if device_id is not None:
+        sensors_query = sensors_query.filter(MotionSensor.device_id == device_id)
+    if motion_sensor_id is not None:
+        sensors_query = sensors_query.filter(MotionSensor.id == motion_sensor_id)
+    sensors = {s.id: s for s in sensors_query}
+
+    def sensor_entry(sensor_id, count):
+        sensor = sensors.get(sensor_id)
+        return {
+            'motion_sensor_id': sensor_id,
+            'name': sensor.name if sensor else None,
+            'device_id': sensor.device_id if sensor else None,
+            'motion_count': count
+        }
+
+    busiest = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+    peak_hours = sorted(
+        (h for h in range(24) if by_hour[h]), key=lambda h: by_hour[h], reverse=True
+    )[:top]
+
+    return {
+        'start': origin.isoformat(),
+        'end': range_end.isoformat(),
+        'bucket_seconds': int(bucket.total_seconds()),
+        'total': sum(histogram),
+        'histogram': [
+            {'bucket_start': (origin + bucket * i).isoformat(), 'motion_count': n}
+            for i, n in enumerate(histogram)
+        ],
+        'hour_of_day': by_hour,
+        'peak_hours': [{'hour': h, 'motion_count': by_hour[h]} for h in peak_hours],
+        'busiest_sensors': [sensor_entry(sensor_id, count) for sensor_id, count in busiest],
+        'idle_sensors': [
+            sensor_entry(sensor_id, 0) for sensor_id, s in sorted(sensors.items())
+            if s.is_active and not totals.get(sensor_id)
+        ]
+    }
@@ -1,33 +1,92 @@
-from flask import Flask, jsonify, request, abort
-import psycopg2
+from flask import Flask, jsonify, request, abort, Response, stream_with_context
 import os
 from dotenv import load_dotenv
 from flask_cors import CORS
-from models import Device, Relay, Base, get_engine
-from sqlalchemy import inspect
-from sqlalchemy.orm import sessionmaker
+from models import Device, Relay, Base, get_engine, pool_stats
+from sqlalchemy import inspect, func, case, text
+from sqlalchemy.orm import sessionmaker, selectinload
+from sqlalchemy.dialects import postgresql, sqlite
 import secrets
 import socket
-from datetime import datetime, time
-from models import MotionSensor, MotionLog
+from datetime import datetime, time, timedelta, timezone
+from models import MotionSensor, MotionLog, MotionRollupHourly, MotionRollupDaily
+from config_watch import config_watcher, mark_config_changed
+from change_feed import change_feed, record_change
+from token_cache import DeviceTokenCache
+from migrations import run_migrations
+from pagination import keyset_page, page_limit, wants_pagination
+from rollups import start_rollup_worker
+from analytics import motion_analytics, parse_bucket
+from telemetry import METRICS, insert_telemetry, fleet_health, prune_telemetry
+from presence import PresenceTracker
+from provisioning import parse_csv, validate_devices, provision
+from relay_commands import (command_stats, enqueue_relay_command, pending_relay_commands,
+                            acknowledge_relay_commands, latest_command_ids, prune_relay_commands)
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
 # Load environment variables from .env
 load_dotenv()
-DB_NAME = os.getenv('DB_NAME', 'central_db')
-DB_USER = os.getenv('DB_USER', 'postgres')
-DB_PASS = os.getenv('DB_PASS', 'password')
-DB_HOST = os.getenv('DB_HOST', 'localhost')
-DB_PORT = os.getenv('DB_PORT', '5432')
 
-# Auto-migrate: create tables if not exist (safe, non-destructive)
+# Auto-migrate: create tables if not exist, then apply versioned migrations (safe, non-destructive)
 engine = get_engine()
 Base.metadata.create_all(engine)
+run_migrations(engine)
 
 Session = sessionmaker(bind=engine)
 
+# Motion batch ingestion limits
+MAX_MOTION_BATCH = int(os.getenv('MAX_MOTION_BATCH', '1000'))
+MAX_EVENT_CLOCK_SKEW = int(os.getenv('MAX_EVENT_CLOCK_SKEW', '300'))  # seconds
+
+# Device token -> device id cache for device-authenticated endpoints
+token_cache = DeviceTokenCache(
+    maxsize=int(os.getenv('TOKEN_CACHE_SIZE', '4096')),
+    ttl=int(os.getenv('TOKEN_CACHE_TTL', '300'))
+)
+
+# Motion rollups and raw log retention
+ROLLUP_ENABLED = os.getenv('ROLLUP_ENABLED', '1') == '1'
+ROLLUP_INTERVAL = int(os.getenv('ROLLUP_INTERVAL', '60'))  # seconds
+MOTION_LOG_RETENTION_DAYS = int(os.getenv('MOTION_LOG_RETENTION_DAYS', '90'))  # 0 keeps raw logs forever
+
+# Device telemetry ingestion, retention and fleet health thresholds
+MAX_TELEMETRY_BATCH = int(os.getenv('MAX_TELEMETRY_BATCH', '1000'))
+TELEMETRY_RETENTION_DAYS = int(os.getenv('TELEMETRY_RETENTION_DAYS', '30'))  # 0 keeps telemetry forever
+FLEET_HEALTH_WINDOW = int(os.getenv('FLEET_HEALTH_WINDOW', '600'))  # seconds
+FLEET_HEALTH_THRESHOLDS = {
+    'hot_temperature': float(os.getenv('FLEET_HOT_TEMPERATURE', '75')),
+    'full_disk': float(os.getenv('FLEET_FULL_DISK_PERCENT', '90')),
+    'overloaded_cpu': float(os.getenv('FLEET_OVERLOADED_CPU_PERCENT', '85')),
+    'overloaded_memory': float(os.getenv('FLEET_OVERLOADED_MEMORY_PERCENT', '90'))
+}
+
+# Bulk provisioning limit (devices per request)
+MAX_PROVISION_DEVICES = int(os.getenv('MAX_PROVISION_DEVICES', '500'))
+
+# Dashboard relay commands: acknowledged rows are kept for latency history
+MAX_RELAY_COMMAND_ACKS = int(os.getenv('MAX_RELAY_COMMAND_ACKS', '500'))
+RELAY_COMMAND_RETENTION_DAYS = int(os.getenv('RELAY_COMMAND_RETENTION_DAYS', '7'))  # 0 keeps commands forever
+RELAY_COMMAND_REDELIVERY = float(os.getenv('RELAY_COMMAND_REDELIVERY', '10'))  # seconds before resending an unacked command
+
+if ROLLUP_ENABLED:
+    start_rollup_worker(Session, ROLLUP_INTERVAL, MOTION_LOG_RETENTION_DAYS, extra_tasks=[
+        ('Telemetry retention', lambda: prune_telemetry(Session, TELEMETRY_RETENTION_DAYS)),
+        ('Relay command retention', lambda: prune_relay_commands(Session, RELAY_COMMAND_RETENTION_DAYS))
+    ])
+
+# Device presence: last_seen is tracked in memory and flushed in bulk
+PRESENCE_FLUSH_INTERVAL = float(os.getenv('PRESENCE_FLUSH_INTERVAL', '5'))  # seconds
+DEVICE_ONLINE_TIMEOUT = int(os.getenv('DEVICE_ONLINE_TIMEOUT', '90'))  # seconds since last contact
+presence = PresenceTracker()
+presence.load(Session)
+presence.start(Session, PRESENCE_FLUSH_INTERVAL)
+
+# Config long-poll limits (seconds)
+LONG_POLL_TIMEOUT = float(os.getenv('LONG_POLL_TIMEOUT', '25'))
+LONG_POLL_MAX_TIMEOUT = float(os.getenv('LONG_POLL_MAX_TIMEOUT', '60'))
+
 @app.route('/')
 def index():
     return 'Central Server Backend is running.'
@@ -35,19 +94,8 @@ def index():
 @app.route('/health')
 def health():
     try:
-        conn = psycopg2.connect(
-            dbname=DB_NAME,
-            user=DB_USER,
-            password=DB_PASS,
-            host=DB_HOST,
-            port=DB_PORT,
-            connect_timeout=3
-        )
-        cur = conn.cursor()
-        cur.execute('SELECT 1;')
-        cur.fetchone()
-        cur.close()
-        conn.close()
+        with engine.connect() as conn:
+            conn.execute(text('SELECT 1'))
         return jsonify({"status": "ok", "db": "ok"}), 200
     except Exception as e:
         return jsonify({"status": "error", "db": "unreachable", "error": str(e)}), 500
@@ -55,7 +103,6 @@ def health():
 @app.route('/api/model_status')
 def model_status():
     """Check if all main tables exist in the database."""
-    engine = get_engine()
     inspector = inspect(engine)
     required_tables = ['devices', 'relays', 'sensors', 'status_logs']
     existing_tables = inspector.get_table_names()
@@ -63,32 +110,151 @@ def model_status():
     all_ok = all(status.values())
     return jsonify({"tables": status, "all_ok": all_ok})
 
-# Helper: get device by token
-def get_device_by_token(token):
-    session = Session()
-    device = session.query(Device).filter_by(token=token).first()
-    session.close()
-    return device
+# Helper: resolve a device token to its device id (cached)
+def authenticate_device(token):
+    """Return the id of the device owning ``token``, or None if it is unknown.
+
+    A successful lookup counts as a heartbeat for that device.
+    """
+    if not token:
+        return None
+    device_id = token_cache.get(token)
+    if device_id is None:
+        session = Session()
+        row = session.query(Device.id).filter_by(token=token).first()
+        session.close()
+        if row:
+            device_id = row.id
+            token_cache.put(token, device_id)
+    if device_id is not None:
+        presence.touch(device_id)
+    return device_id
+
+def device_last_seen(device):
+    """last_seen including heartbeats not yet flushed to the database."""
+    last_seen = presence.last_seen(device.id) or device.last_seen
+    return last_seen.isoformat() if last_seen else None
+
+# Helper: per-device config versioning for conditional GETs
+def bump_config_version(session, device_id):
+    """Mark a device's relay/motion sensor config as changed (committed by the caller)."""
+    session.query(Device).filter(Device.id == device_id).update(
+        {Device.config_version: Device.config_version + 1}, synchronize_session=False
+    )
+    mark_config_changed(session, device_id)
+
+def config_etag(kind, device):
+    return f'{kind}-{device.id}-{device.config_version or 0}'
 
 # Device CRUD
 @app.route('/api/devices', methods=['GET'])
 def list_devices():
+    """List devices. With ?limit= and/or ?after= returns {'devices': [...], 'next_cursor': ...}."""
+    paginated = wants_pagination(request.args)
+    try:
+        limit = page_limit(request.args)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
     session = Session()
-    devices = session.query(Device).all()
+    next_cursor = None
+    if paginated:
+        try:
+            devices, next_cursor = keyset_page(session.query(Device), [Device.id], limit, request.args.get('after'))
+        except ValueError as e:
+            session.close()
+            return jsonify({'error': str(e)}), 400
+    else:
+        devices = session.query(Device).all()
     result = [
         {
             'id': d.id,
             'name': d.name,
             'ip_address': d.ip_address,
             'token': d.token,
-            'last_seen': d.last_seen.isoformat() if d.last_seen else None,
+            'last_seen': device_last_seen(d),
             'description': d.description,
             'is_active': d.is_active
         } for d in devices
     ]
     session.close()
+    if paginated:
+        return jsonify({'devices': result, 'next_cursor': next_cursor})
     return jsonify(result)
 
+# Endpoint: Fleet snapshot (devices with their relays and motion sensors)
+@app.route('/api/fleet', methods=['GET'])
+def get_fleet():
+    """Devices with relays and motion sensors nested, in three queries total.
+
+    Query params: is_active=true|false filters devices,
+    motion_sensor_active=true|false filters the nested motion sensors,
+    limit/after page through devices by id.
+    """
+    def bool_arg(name):
+        value = request.args.get(name)
+        if value is None:
+            return None
+        return value.lower() in ('1', 'true', 'yes')
+
+    try:
+        limit = page_limit(request.args)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    is_active = bool_arg('is_active')
+    motion_sensor_active = bool_arg('motion_sensor_active')
+
+    motion_sensors_rel = Device.motion_sensors
+    if motion_sensor_active is not None:
+        motion_sensors_rel = Device.motion_sensors.and_(MotionSensor.is_active == motion_sensor_active)
+    session = Session()
+    query = session.query(Device).options(
+        selectinload(Device.relays),
+        selectinload(motion_sensors_rel)
+    )
+    if is_active is not None:
+        query = query.filter(Device.is_active == is_active)
+    next_cursor = None
+    if wants_pagination(request.args):
+        try:
+            devices, next_cursor = keyset_page(query, [Device.id], limit, request.args.get('after'))
+        except ValueError as e:
+            session.close()
+            return jsonify({'error': str(e)}), 400
+    else:
+        devices = query.order_by(Device.id).all()
+    result = [
+        {
+            'id': d.id,
+            'name': d.name,
+            'ip_address': d.ip_address,
+            'last_seen': device_last_seen(d),
+            'description': d.description,
+            'is_active': d.is_active,
+            'relays': [
+                {
+                    'id': r.id,
+                    'name': r.name,
+                    'gpio_pin': r.gpio_pin,
+                    'status': r.status,
+                    'last_update': r.last_update.isoformat() if r.last_update else None
+                } for r in sorted(d.relays, key=lambda r: r.id)
+            ],
+            'motion_sensors': [
+                {
+                    'id': ms.id,
+                    'name': ms.name,
+                    'gpio_pin': ms.gpio_pin,
+                    'is_active': ms.is_active,
+                    'last_motion_detected': ms.last_motion_detected.isoformat() if ms.last_motion_detected else None,
+                    'motion_count': ms.motion_count,
+                    'last_update': ms.last_update.isoformat() if ms.last_update else None
+                } for ms in sorted(d.motion_sensors, key=lambda ms: ms.id)
+            ]
+        } for d in devices
+    ]
+    session.close()
+    return jsonify({'devices': result, 'next_cursor': next_cursor})
+
 @app.route('/api/devices', methods=['POST'])
 def create_device():
     data = request.get_json()
@@ -104,11 +270,76 @@ def create_device():
         is_active=data.get('is_active', True)
     )
     session.add(device)
+    session.flush()
+    record_change(session, 'device.created', device_id=device.id, name=device.name)
     session.commit()
     result = {'id': device.id, 'name': device.name, 'token': device.token}
     session.close()
+    presence.register(result['id'])
     return jsonify(result), 201
 
+# Endpoint: Bulk provision devices with relays and motion sensors
+@app.route('/api/devices/bulk', methods=['POST'])
+def provision_devices():
+    """Create many devices and their channels in one transaction.
+
+    JSON body: {"devices": [{"name", "ip_address", "relays": [...], "motion_sensors": [...]}]}
+    (or the bare list), or CSV (Content-Type text/csv, or a multipart "file")
+    with one row per channel. ?dry_run=1 (or "dry_run": true) validates
+    without writing. Any validation error rejects the whole request.
+    """
+    dry_run = request.args.get('dry_run', '').lower() in ('1', 'true', 'yes')
+    try:
+        if 'file' in request.files:
+            devices = parse_csv(request.files['file'].read().decode('utf-8-sig'))
+        elif request.mimetype == 'text/csv':
+            devices = parse_csv(request.get_data(as_text=True))
+        else:
+            data = request.get_json(silent=True)
+            if isinstance(data, dict):
+                dry_run = dry_run or bool(data.get('dry_run'))
+                data = data.get('devices')
+            if not isinstance(data, list):
+                return jsonify({'error': 'Provide a devices list or CSV'}), 400
+            devices = data
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({'error': f'Invalid CSV: {e}'}), 400
+    if not devices:
+        return jsonify({'error': 'No devices to provision'}), 400
+    if len(devices) > MAX_PROVISION_DEVICES:
+        return jsonify({'error': f'At most {MAX_PROVISION_DEVICES} devices per request'}), 413
+
+    session = Session()
+    # Only strings can be looked up; validate_devices reports other token types per row
+    tokens = [d['token'] for d in devices if isinstance(d, dict) and isinstance(d.get('token'), str) and d['token']]
+    existing_tokens = {row.token for row in session.query(Device.token).filter(Device.token.in_(tokens))} if tokens else set()
+    plans, errors = validate_devices(devices, existing_tokens)
+    summary = {
+        'devices': len(plans),
+        'relays': sum(len(relays) for _, relays, _ in plans),
+        'motion_sensors': sum(len(sensors) for _, _, sensors in plans)
+    }
+    if errors:
+        session.close()
+        return jsonify({'error': 'Validation failed, nothing was created', 'errors': errors}), 400
+    if dry_run:
+        session.close()
+        return jsonify({'dry_run': True, 'summary': summary})
+    try:
+        created = provision(session, plans)
+        for device in created:
+            record_change(session, 'device.created', device_id=device['id'], name=device['name'])
+        session.commit()
+    except Exception:
+        session.rollback()
+        session.close()
+        app.logger.exception('Bulk provisioning failed')
+        return jsonify({'error': 'Provisioning failed, nothing was created'}), 500
+    session.close()
+    for device in created:
+        presence.register(device['id'])
+    return jsonify({'summary': summary, 'devices': created}), 201
+
 # Endpoint: Get device token (admin use)
 @app.route('/api/devices/<int:device_id>/token', methods=['GET'])
 def get_device_token(device_id):
@@ -133,7 +364,7 @@ def get_device(device_id):
         'name': device.name,
         'ip_address': device.ip_address,
         'token': device.token,
-        'last_seen': device.last_seen.isoformat() if device.last_seen else None,
+        'last_seen': device_last_seen(device),
         'description': device.description,
         'is_active': device.is_active
     }
@@ -148,11 +379,15 @@ def update_device(device_id):
     if not device:
         session.close()
         return jsonify({'error': 'Device not found'}), 404
-    for field in ['name', 'ip_address', 'token', 'description', 'is_active']:
-        if field in data:
-            setattr(device, field, data[field])
+    fields = [f for f in ['name', 'ip_address', 'token', 'description', 'is_active'] if f in data]
+    for field in fields:
+        setattr(device, field, data[field])
+    record_change(session, 'device.updated', device_id=device_id,
+                  fields=[f for f in fields if f != 'token'])
     session.commit()
     session.close()
+    if 'token' in data:
+        token_cache.invalidate_device(device_id)
     return jsonify({'message': 'Device updated'})
 
 @app.route('/api/devices/<int:device_id>', methods=['DELETE'])
@@ -163,15 +398,60 @@ def delete_device(device_id):
         session.close()
         return jsonify({'error': 'Device not found'}), 404
     session.delete(device)
+    record_change(session, 'device.deleted', device_id=device_id)
     session.commit()
     session.close()
+    token_cache.invalidate_device(device_id)
+    presence.forget(device_id)
     return jsonify({'message': 'Device deleted'})
 
+# Endpoint: Device heartbeat
+@app.route('/api/devices/heartbeat', methods=['POST'])
+def device_heartbeat():
+    """Mark the token's device as online; served from memory, no database write."""
+    data = request.get_json(silent=True) or {}
+    device_id = authenticate_device(request.headers.get('X-Device-Token') or data.get('token'))
+    if device_id is None:
+        return jsonify({'error': 'Valid device token required'}), 401
+    return jsonify({'device_id': device_id, 'server_time': datetime.utcnow().isoformat()})
+
+# Endpoint: Online/offline view of all devices
+@app.route('/api/devices/presence', methods=['GET'])
+def devices_presence():
+    """Devices seen within ?timeout= seconds (default DEVICE_ONLINE_TIMEOUT) are online."""
+    timeout = request.args.get('timeout', DEVICE_ONLINE_TIMEOUT, type=int)
+    online, offline = presence.snapshot(timeout)
+
+    def entry(item):
+        device_id, last_seen = item
+        return {'device_id': device_id, 'last_seen': last_seen.isoformat() if last_seen else None}
+
+    return jsonify({
+        'online': [entry(item) for item in online],
+        'offline': [entry(item) for item in offline],
+        'online_count': len(online),
+        'offline_count': len(offline),
+        'timeout_seconds': timeout
+    })
+
 # Relay CRUD (per device)
 @app.route('/api/relays', methods=['GET'])
 def list_all_relays():
+    """List relays; paginated by id when ?limit= or ?after= is given."""
+    try:
+        limit = page_limit(request.args)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
     session = Session()
-    relays = session.query(Relay).all()
+    next_cursor = None
+    if wants_pagination(request.args):
+        try:
+            relays, next_cursor = keyset_page(session.query(Relay), [Relay.id], limit, request.args.get('after'))
+        except ValueError as e:
+            session.close()
+            return jsonify({'error': str(e)}), 400
+    else:
+        relays = session.query(Relay).all()
     result = [
         {
             'id': r.id,
@@ -183,7 +463,7 @@ def list_all_relays():
         } for r in relays
     ]
     session.close()
-    return jsonify({'relays': result})
+    return jsonify({'relays': result, 'next_cursor': next_cursor})
 
 @app.route('/api/devices/<int:device_id>/relays', methods=['GET'])
 def list_relays(device_id):
@@ -219,6 +499,9 @@ def create_relay(device_id):
         status=data.get('status', False)
     )
     session.add(relay)
+    bump_config_version(session, device_id)
+    session.flush()
+    record_change(session, 'relay.created', relay_id=relay.id, device_id=device_id)
     session.commit()
     result = {'id': relay.id, 'name': relay.name}
     session.close()
@@ -232,12 +515,28 @@ def update_relay(relay_id):
     if not relay:
         session.close()
         return jsonify({'error': 'Relay not found'}), 404
-    for field in ['name', 'gpio_pin', 'status']:
-        if field in data:
-            setattr(relay, field, data[field])
+    fields = [f for f in ['name', 'gpio_pin', 'status'] if f in data]
+    status_changed = 'status' in data and bool(data['status']) != bool(relay.status)
+    for field in fields:
+        setattr(relay, field, data[field])
+    command_id, superseded = None, 0
+    if status_changed:
+        # Delivered through the long-poll and applied to this pin only
+        relay.last_update = datetime.utcnow()
+        command, superseded = enqueue_relay_command(session, relay, relay.status)
+        session.flush()
+        command_id = command.id
+    if set(fields) - {'status'}:
+        bump_config_version(session, relay.device_id)
+    record_change(session, 'relay.updated', relay_id=relay_id, device_id=relay.device_id, fields=fields)
+    if status_changed:
+        record_change(session, 'relay.status_changed', relay_id=relay_id, device_id=relay.device_id,
+                      status=bool(relay.status), source='dashboard')
     session.commit()
     session.close()
-    return jsonify({'message': 'Relay updated'})
+    if command_id is not None:
+        command_stats.record_enqueue(superseded)
+    return jsonify({'message': 'Relay updated', 'command_id': command_id})
 
 @app.route('/api/relays/<int:relay_id>', methods=['DELETE'])
 def delete_relay(relay_id):
@@ -247,6 +546,8 @@ def delete_relay(relay_id):
         session.close()
         return jsonify({'error': 'Relay not found'}), 404
     session.delete(relay)
+    bump_config_version(session, relay.device_id)
+    record_change(session, 'relay.deleted', relay_id=relay_id, device_id=relay.device_id)
     session.commit()
     session.close()
     return jsonify({'message': 'Relay deleted'})
@@ -254,22 +555,135 @@ def delete_relay(relay_id):
 # Endpoint: Get relay config for a device
 @app.route('/api/devices/<int:device_id>/relays/config', methods=['GET'])
 def get_device_relay_config(device_id):
+    authenticate_device(request.headers.get('X-Device-Token'))  # Counts as a heartbeat
     session = Session()
     device = session.query(Device).get(device_id)
     if not device:
         session.close()
         return jsonify({'error': 'Device not found'}), 404
+    etag = config_etag('relays', device)
+    if request.if_none_match.contains(etag):
+        session.close()
+        return '', 304, {'ETag': f'"{etag}"'}
     relays = session.query(Relay).filter_by(device_id=device_id).all()
+    command_ids = latest_command_ids(session, [r.id for r in relays])
     result = [
         {
             'id': r.id,
             'name': r.name,
             'gpio_pin': r.gpio_pin,
-            'status': r.status
+            'status': r.status,
+            'last_command_id': command_ids.get(r.id, 0)  # status already reflects this command
         } for r in relays
     ]
+    config_version = device.config_version
     session.close()
-    return jsonify({'relays': result})
+    response = jsonify({'relays': result, 'config_version': config_version})
+    response.set_etag(etag)
+    return response
+
+def get_config_version(device_id):
+    session = Session()
+    row = session.query(Device.config_version).filter(Device.id == device_id).first()
+    session.close()
+    return row.config_version if row else None
+
+# Endpoint: Long-poll for device config changes
+@app.route('/api/devices/<int:device_id>/config/wait', methods=['GET'])
+def wait_for_config_change(device_id):
+    """Hold the request until the device's config version differs from ?version=.
+
+    Returns immediately when no version is given, it is already stale or
+    relay commands are due for delivery, otherwise after a change is committed or
+    ?timeout= seconds elapse. Pending relay commands are only included for
+    the authenticated device; it acknowledges them via
+    /api/devices/<id>/relays/commands/ack. Unacknowledged commands are
+    resent after RELAY_COMMAND_REDELIVERY seconds; the wait is cut short
+    when one of them falls due.
+    """
+    known_version = request.args.get('version', type=int)
+    timeout = min(max(request.args.get('timeout', LONG_POLL_TIMEOUT, type=float), 0), LONG_POLL_MAX_TIMEOUT)
+    token = request.headers.get('X-Device-Token')
+    owner = authenticate_device(token) == device_id  # Counts as a heartbeat
+    generation = config_watcher.generation(device_id)
+    current_version = get_config_version(device_id)
+    if current_version is None:
+        return jsonify({'error': 'Device not found'}), 404
+    commands, retry_in = take_relay_commands(device_id) if owner else ([], None)
+    if known_version is not None and current_version == known_version and not commands:
+        remaining = timeout
+        while remaining > 0:
+            wait = remaining if retry_in is None else min(remaining, retry_in)
+            if config_watcher.wait(device_id, generation, wait):
+                current_version = get_config_version(device_id)
+                commands, _ = take_relay_commands(device_id) if owner else ([], None)
+                break
+            remaining -= wait
+            if retry_in is not None:
+                # A held-back command fell due for redelivery
+                commands, retry_in = take_relay_commands(device_id)
+                if commands:
+                    break
+        authenticate_device(token)  # Still connected after holding the request
+    return jsonify({
+        'config_version': current_version,
+        'changed': current_version != known_version,
+        'commands': commands
+    })
+
+def take_relay_commands(device_id):
+    session = Session()
+    commands, retry_in = pending_relay_commands(session, device_id, RELAY_COMMAND_REDELIVERY)
+    session.commit()
+    session.close()
+    return commands, retry_in
+
+# Endpoint: Device acknowledges applied relay commands
+@app.route('/api/devices/<int:device_id>/relays/commands/ack', methods=['POST'])
+def acknowledge_commands(device_id):
+    """Body: {"acks": [{"id": 12, "ok": true}, {"id": 13, "ok": false, "error": "..."}]}"""
+    data = request.get_json(silent=True) or {}
+    token = request.headers.get('X-Device-Token') or data.get('token')
+    if not token:
+        return jsonify({'error': 'Device token required'}), 401
+    if authenticate_device(token) != device_id:
+        return jsonify({'error': 'Unauthorized device'}), 403
+    acks = data.get('acks')
+    if not isinstance(acks, list) or not acks:
+        return jsonify({'error': 'acks list is required'}), 400
+    if len(acks) > MAX_RELAY_COMMAND_ACKS:
+        return jsonify({'error': f'At most {MAX_RELAY_COMMAND_ACKS} acks per request'}), 413
+    try:
+        acks = [dict(ack, id=int(ack['id'])) for ack in acks]
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'Each ack needs an integer id'}), 400
+    for ack in acks:
+        if not isinstance(ack.get('ok', True), bool):
+            return jsonify({'error': 'ack ok must be true or false'}), 400
+        if ack.get('error') is not None and not isinstance(ack['error'], str):
+            return jsonify({'error': 'ack error must be a string'}), 400
+    session = Session()
+    commands, unknown = acknowledge_relay_commands(session, device_id, acks)
+    acked = [(c.id, c.relay_id, c.status, c.ok, c.latency_ms) for c in commands]
+    failed = {relay_id: status for _, relay_id, status, ok, _ in acked if not ok}
+    # The pin never reached a failed command's state; report the one it kept
+    for relay in (session.query(Relay).filter(Relay.id.in_(list(failed))).all() if failed else []):
+        if bool(relay.status) == failed[relay.id]:
+            relay.status = not failed[relay.id]
+            record_change(session, 'relay.status_changed', relay_id=relay.id, device_id=device_id,
+                          status=relay.status, source='command_failed')
+    for command_id, relay_id, status, ok, latency_ms in acked:
+        record_change(session, 'relay.command_acked', command_id=command_id, relay_id=relay_id,
+                      device_id=device_id, status=status, ok=ok, latency_ms=latency_ms)
+    session.commit()
+    session.close()
+    for _, _, _, ok, latency_ms in acked:
+        command_stats.record_ack(latency_ms, ok)
+    return jsonify({
+        'acked': [{'id': command_id, 'ok': ok, 'latency_ms': latency_ms}
+                  for command_id, _, _, ok, latency_ms in acked],
+        'unknown': unknown
+    })
 
 # Endpoint: Device updates relay status
 @app.route('/api/relays/<int:relay_id>/status', methods=['PUT'])
@@ -282,24 +696,93 @@ def update_relay_status_from_device(relay_id):
     if not relay:
         session.close()
         return jsonify({'error': 'Relay not found'}), 404
-    device = session.query(Device).get(relay.device_id)
-    if not device or device.token != token:
+    if authenticate_device(token) != relay.device_id:
         session.close()
         return jsonify({'error': 'Unauthorized device'}), 403
     data = request.get_json()
     if not data or 'status' not in data:
         session.close()
         return jsonify({'error': 'Status is required'}), 400
-    relay.status = bool(data['status'])
+    # The device owns this state, so it is not a config change to push back to it
+    status = bool(data['status'])
+    relay.last_update = datetime.utcnow()
+    if bool(relay.status) != status:
+        relay.status = status
+        record_change(session, 'relay.status_changed', relay_id=relay_id, device_id=relay.device_id,
+                      status=status, source='device')
     session.commit()
     session.close()
     return jsonify({'message': 'Relay status updated'})
 
+@app.route('/api/devices/<int:device_id>/relays/status', methods=['PUT'])
+def update_relay_statuses_from_device(device_id):
+    """Apply several relay states reported by a device in one transaction.
+
+    Body: {"relays": [{"id": 1, "status": true, "command_id": 12}, ...]}
+    ``command_id`` is the last dashboard command the device had applied to
+    the relay when it switched. If a newer command has been issued since,
+    the report is skipped as stale: the device has not seen that command
+    yet and will apply it from the long-poll. Reports are otherwise ordered
+    by arrival, and without command_id they are always applied. The config
+    version is left alone: the device is the source of this state.
+    """
+    data = request.get_json(silent=True) or {}
+    token = request.headers.get('X-Device-Token') or data.get('token')
+    if not token:
+        return jsonify({'error': 'Device token required'}), 401
+    if authenticate_device(token) != device_id:
+        return jsonify({'error': 'Unauthorized device'}), 403
+    reports = data.get('relays')
+    if not isinstance(reports, list) or not reports:
+        return jsonify({'error': 'relays list is required'}), 400
+    statuses = {}
+    try:
+        for r in reports:
+            command_id = r.get('command_id')
+            statuses[int(r['id'])] = (bool(r['status']), int(command_id) if command_id is not None else None)
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return jsonify({'error': 'Each relay needs an integer id and a status'}), 400
+    session = Session()
+    relays = session.query(Relay).filter(Relay.device_id == device_id, Relay.id.in_(list(statuses))).all()
+    newest_commands = latest_command_ids(session, statuses)
+    now = datetime.utcnow()
+    updated, stale = 0, []
+    for relay in relays:
+        status, command_id = statuses[relay.id]
+        if command_id is not None and newest_commands.get(relay.id, 0) > command_id:
+            stale.append(relay.id)
+            continue
+        relay.last_update = now
+        updated += 1
+        if bool(relay.status) != status:
+            relay.status = status
+            record_change(session, 'relay.status_changed', relay_id=relay.id, device_id=device_id,
+                          status=status, source='device')
+    found = {relay.id for relay in relays}
+    session.commit()
+    session.close()
+    return jsonify({'updated': updated, 'stale': sorted(stale), 'not_found': sorted(set(statuses) - found)})
+
 # Motion Sensor Management APIs
 @app.route('/api/motion_sensors', methods=['GET'])
 def list_all_motion_sensors():
+    """List motion sensors; paginated by id when ?limit= or ?after= is given."""
+    try:
+        limit = page_limit(request.args)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
     session = Session()
-    motion_sensors = session.query(MotionSensor).all()
+    next_cursor = None
+    if wants_pagination(request.args):
+        try:
+            motion_sensors, next_cursor = keyset_page(
+                session.query(MotionSensor), [MotionSensor.id], limit, request.args.get('after')
+            )
+        except ValueError as e:
+            session.close()
+            return jsonify({'error': str(e)}), 400
+    else:
+        motion_sensors = session.query(MotionSensor).all()
     result = [
         {
             'id': ms.id,
@@ -322,7 +805,7 @@ def list_all_motion_sensors():
         } for ms in motion_sensors
     ]
     session.close()
-    return jsonify({'motion_sensors': result})
+    return jsonify({'motion_sensors': result, 'next_cursor': next_cursor})
 
 @app.route('/api/devices/<int:device_id>/motion_sensors', methods=['GET'])
 def list_device_motion_sensors(device_id):
@@ -390,6 +873,9 @@ def create_motion_sensor(device_id):
     )
     
     session.add(motion_sensor)
+    bump_config_version(session, device_id)
+    session.flush()
+    record_change(session, 'motion_sensor.created', motion_sensor_id=motion_sensor.id, device_id=device_id)
     session.commit()
     
     # Get the ID before closing the session
@@ -444,6 +930,9 @@ def update_motion_sensor(motion_sensor_id):
         else:
             motion_sensor.end_time = None
     
+    bump_config_version(session, motion_sensor.device_id)
+    record_change(session, 'motion_sensor.updated', motion_sensor_id=motion_sensor_id,
+                  device_id=motion_sensor.device_id)
     session.commit()
     session.close()
     return jsonify({'message': 'Motion sensor updated'})
@@ -456,6 +945,9 @@ def delete_motion_sensor(motion_sensor_id):
         session.close()
         return jsonify({'error': 'Motion sensor not found'}), 404
     session.delete(motion_sensor)
+    bump_config_version(session, motion_sensor.device_id)
+    record_change(session, 'motion_sensor.deleted', motion_sensor_id=motion_sensor_id,
+                  device_id=motion_sensor.device_id)
     session.commit()
     session.close()
     return jsonify({'message': 'Motion sensor deleted'})
@@ -463,22 +955,39 @@ def delete_motion_sensor(motion_sensor_id):
 # Endpoint: Get motion sensor config for a device
 @app.route('/api/devices/<int:device_id>/motion_sensors/config', methods=['GET'])
 def get_device_motion_sensor_config(device_id):
+    authenticate_device(request.headers.get('X-Device-Token'))  # Counts as a heartbeat
     session = Session()
     device = session.query(Device).get(device_id)
     if not device:
         session.close()
         return jsonify({'error': 'Device not found'}), 404
+    etag = config_etag('motion_sensors', device)
+    if request.if_none_match.contains(etag):
+        session.close()
+        return '', 304, {'ETag': f'"{etag}"'}
     motion_sensors = session.query(MotionSensor).filter_by(device_id=device_id, is_active=True).all()
     result = [
         {
             'id': ms.id,
             'name': ms.name,
             'gpio_pin': ms.gpio_pin,
-            'is_active': ms.is_active
+            'is_active': ms.is_active,
+            'sensitivity': ms.sensitivity,
+            'delay_time': ms.delay_time,
+            'trigger_mode': ms.trigger_mode,
+            'enable_scheduling': ms.enable_scheduling,
+            'start_time': ms.start_time.strftime('%H:%M') if ms.start_time else None,
+            'end_time': ms.end_time.strftime('%H:%M') if ms.end_time else None,
+            'timezone': ms.timezone,
+            'weekday_monitoring': ms.weekday_monitoring,
+            'weekend_monitoring': ms.weekend_monitoring
         } for ms in motion_sensors
     ]
+    config_version = device.config_version
     session.close()
-    return jsonify({'motion_sensors': result})
+    response = jsonify({'motion_sensors': result, 'config_version': config_version})
+    response.set_etag(etag)
+    return response
 
 # Endpoint: Device reports motion detection
 @app.route('/api/motion_sensors/<int:motion_sensor_id>/motion', methods=['POST'])
@@ -491,34 +1000,252 @@ def report_motion_detection(motion_sensor_id):
     if not motion_sensor:
         session.close()
         return jsonify({'error': 'Motion sensor not found'}), 404
-    device = session.query(Device).get(motion_sensor.device_id)
-    if not device or device.token != token:
+    device_id = authenticate_device(token)
+    if device_id != motion_sensor.device_id:
         session.close()
         return jsonify({'error': 'Unauthorized device'}), 403
     # Update motion sensor status
-    motion_sensor.last_motion_detected = datetime.datetime.utcnow()
+    motion_sensor.last_motion_detected = datetime.utcnow()
     motion_sensor.motion_count += 1
-    motion_sensor.last_update = datetime.datetime.utcnow()
+    motion_sensor.last_update = datetime.utcnow()
     # Create motion log
     motion_log = MotionLog(
         motion_sensor_id=motion_sensor_id,
-        device_id=device.id,
-        motion_detected=datetime.datetime.utcnow()
+        device_id=device_id,
+        motion_detected=datetime.utcnow()
     )
     session.add(motion_log)
+    record_change(session, 'motion.detected', motion_sensor_id=motion_sensor_id, device_id=device_id,
+                  count=1, last_motion_detected=motion_log.motion_detected.isoformat())
     session.commit()
     session.close()
     return jsonify({'message': 'Motion detected and logged'})
 
+def parse_event_timestamp(value):
+    """Parse an ISO-8601 event timestamp into a naive UTC datetime."""
+    if not value:
+        return datetime.utcnow()
+    ts = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+# Endpoint: Device reports a batch of motion events
+@app.route('/api/devices/<int:device_id>/motion/batch', methods=['POST'])
+def report_motion_batch(device_id):
+    """Ingest many timestamped motion events from one device in a single transaction.
+
+    Body: {"events": [{"id": "...", "motion_sensor_id": 1, "timestamp": "ISO-8601"}, ...]}
+    The response lists the event ids that were accepted and the ones that were
+    rejected, so the device can drop accepted events from its outbound queue.
+    Event ids are stored per device; an event already stored (a retried or
+    replayed batch) is accepted again but not logged or counted twice.
+    """
+    data = request.get_json(silent=True) or {}
+    token = request.headers.get('X-Device-Token') or data.get('token')
+    if not token:
+        return jsonify({'error': 'Device token required'}), 401
+    events = data.get('events')
+    if not isinstance(events, list) or not events:
+        return jsonify({'error': 'events must be a non-empty list'}), 400
+    if len(events) > MAX_MOTION_BATCH:
+        return jsonify({'error': f'At most {MAX_MOTION_BATCH} events per batch'}), 413
+    if authenticate_device(token) != device_id:
+        return jsonify({'error': 'Unauthorized device'}), 403
+    session = Session()
+
+    sensor_ids = {
+        e.get('motion_sensor_id') for e in events
+        if isinstance(e, dict) and isinstance(e.get('motion_sensor_id'), int)
+    }
+    owned_sensor_ids = {
+        row.id for row in session.query(MotionSensor.id)
+        .filter(MotionSensor.device_id == device_id, MotionSensor.id.in_(sensor_ids))
+    }
+
+    now = datetime.utcnow()
+    max_skew = timedelta(seconds=MAX_EVENT_CLOCK_SKEW)
+    accepted, rejected = [], []
+    log_rows = []
+    seen_ids = set()
+    for index, event in enumerate(events):
+        if not isinstance(event, dict):
+            rejected.append({'id': str(index), 'error': 'Event must be an object'})
+            continue
+        event_id = str(event.get('id', index))
+        sensor_id = event.get('motion_sensor_id')
+        if sensor_id not in owned_sensor_ids:
+            rejected.append({'id': event_id, 'error': 'Motion sensor not found for device'})
+            continue
+        try:
+            detected_at = parse_event_timestamp(event.get('timestamp'))
+        except (TypeError, ValueError):
+            rejected.append({'id': event_id, 'error': 'Invalid timestamp'})
+            continue
+        if detected_at > now + max_skew:
+            rejected.append({'id': event_id, 'error': 'Timestamp is in the future'})
+            continue
+        accepted.append(event_id)
+        if 'id' in event:
+            if event_id in seen_ids:
+                continue  # Same event twice in one batch
+            seen_ids.add(event_id)
+        log_rows.append({
+            'motion_sensor_id': sensor_id,
+            'device_id': device_id,
+            'motion_detected': detected_at,
+            'event_id': event_id if 'id' in event else None
+        })
+
+    inserted = []
+    if log_rows:
+        dialect_insert = postgresql.insert if session.bind.dialect.name == 'postgresql' else sqlite.insert
+        inserted = session.execute(
+            dialect_insert(MotionLog)
+            .on_conflict_do_nothing(index_elements=[MotionLog.device_id, MotionLog.event_id])
+            .returning(MotionLog.motion_sensor_id, MotionLog.motion_detected),
+            log_rows
+        ).all()
+    per_sensor = {}  # motion_sensor_id -> [count, latest timestamp], newly stored events only
+    for sensor_id, detected_at in inserted:
+        stats = per_sensor.setdefault(sensor_id, [0, detected_at])
+        stats[0] += 1
+        if detected_at > stats[1]:
+            stats[1] = detected_at
+
+    if inserted:
+        for sensor_id, (count, latest) in per_sensor.items():
+            # Increment in SQL so concurrent batches never lose counts
+            session.query(MotionSensor).filter(MotionSensor.id == sensor_id).update({
+                MotionSensor.motion_count: func.coalesce(MotionSensor.motion_count, 0) + count,
+                MotionSensor.last_motion_detected: case(
+                    (MotionSensor.last_motion_detected.is_(None), latest),
+                    (MotionSensor.last_motion_detected < latest, latest),
+                    else_=MotionSensor.last_motion_detected
+                ),
+                MotionSensor.last_update: now
+            }, synchronize_session=False)
+            record_change(session, 'motion.detected', motion_sensor_id=sensor_id, device_id=device_id,
+                          count=count, last_motion_detected=latest.isoformat())
+        session.commit()
+    session.close()
+    return jsonify({
+        'accepted': accepted,
+        'rejected': rejected,
+        'accepted_count': len(accepted),
+        'rejected_count': len(rejected),
+        'duplicate_count': len(accepted) - len(inserted)
+    })
+
+# Endpoint: Device pushes a batch of telemetry samples
+@app.route('/api/devices/<int:device_id>/telemetry/batch', methods=['POST'])
+def report_telemetry_batch(device_id):
+    """Store periodic health samples from one device with a single bulk insert.
+
+    Body: {"samples": [{"id": "...", "timestamp": "ISO-8601", "cpu_percent": 12.5,
+    "memory_percent": 40.1, "disk_percent": 63.0, "temperature": 51.2}, ...]}
+    Samples already stored for the same timestamp are accepted and ignored.
+    """
+    data = request.get_json(silent=True) or {}
+    token = request.headers.get('X-Device-Token') or data.get('token')
+    if not token:
+        return jsonify({'error': 'Device token required'}), 401
+    samples = data.get('samples')
+    if not isinstance(samples, list) or not samples:
+        return jsonify({'error': 'samples must be a non-empty list'}), 400
+    if len(samples) > MAX_TELEMETRY_BATCH:
+        return jsonify({'error': f'At most {MAX_TELEMETRY_BATCH} samples per batch'}), 413
+    if authenticate_device(token) != device_id:
+        return jsonify({'error': 'Unauthorized device'}), 403
+
+    max_ts = datetime.utcnow() + timedelta(seconds=MAX_EVENT_CLOCK_SKEW)
+    accepted, rejected, rows = [], [], {}
+    for index, sample in enumerate(samples):
+        if not isinstance(sample, dict):
+            rejected.append({'id': str(index), 'error': 'Sample must be an object'})
+            continue
+        sample_id = str(sample.get('id', index))
+        try:
+            ts = parse_event_timestamp(sample.get('timestamp'))
+            values = {m: float(sample[m]) if sample.get(m) is not None else None for m in METRICS}
+        except (TypeError, ValueError):
+            rejected.append({'id': sample_id, 'error': 'Invalid timestamp or metric value'})
+            continue
+        if ts > max_ts:
+            rejected.append({'id': sample_id, 'error': 'Timestamp is in the future'})
+            continue
+        rows[ts] = dict(values, device_id=device_id, ts=ts)  # Duplicate timestamps in one batch collapse
+        accepted.append(sample_id)
+
+    if rows:
+        session = Session()
+        try:
+            insert_telemetry(session, list(rows.values()))
+            session.commit()
+        finally:
+            session.close()
+    return jsonify({
+        'accepted': accepted,
+        'rejected': rejected,
+        'accepted_count': len(accepted),
+        'rejected_count': len(rejected)
+    })
+
+# Endpoint: Fleet health from the latest telemetry of every device
+@app.route('/api/fleet/health', methods=['GET'])
+def get_fleet_health():
+    """Which devices are hot, full, overloaded or stale.
+
+    ?window= seconds of telemetry to consider (default FLEET_HEALTH_WINDOW),
+    ?problems=true returns only flagged devices.
+    """
+    window = request.args.get('window', FLEET_HEALTH_WINDOW, type=int)
+    if window <= 0:
+        return jsonify({'error': 'window must be a positive number of seconds'}), 400
+    problems_only = request.args.get('problems', '').lower() in ('1', 'true', 'yes')
+    session = Session()
+    try:
+        devices = fleet_health(session, timedelta(seconds=window), FLEET_HEALTH_THRESHOLDS, problems_only)
+    finally:
+        session.close()
+    summary = {flag: sum(1 for d in devices if flag in d['flags']) for flag in ('hot', 'full', 'overloaded', 'stale')}
+    return jsonify({
+        'devices': devices,
+        'summary': summary,
+        'thresholds': FLEET_HEALTH_THRESHOLDS,
+        'window_seconds': window
+    })
+
 # Endpoint: Get motion logs for a device
 @app.route('/api/devices/<int:device_id>/motion_logs', methods=['GET'])
 def get_device_motion_logs(device_id):
+    """Newest-first motion logs for a device, one keyset page at a time.
+
+    Without ?limit=/?after= returns the newest 100 logs as a plain list (the
+    next page cursor is in the X-Next-Cursor header); with them returns
+    {'motion_logs': [...], 'next_cursor': ...}.
+    """
+    paginated = wants_pagination(request.args)
+    try:
+        limit = page_limit(request.args)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
     session = Session()
     device = session.query(Device).get(device_id)
     if not device:
         session.close()
         return jsonify({'error': 'Device not found'}), 404
-    motion_logs = session.query(MotionLog).filter_by(device_id=device_id).order_by(MotionLog.motion_detected.desc()).limit(100).all()
+    try:
+        motion_logs, next_cursor = keyset_page(
+            session.query(MotionLog).filter_by(device_id=device_id),
+            [MotionLog.motion_detected, MotionLog.id],
+            limit,
+            request.args.get('after'),
+            descending=True
+        )
+    except ValueError as e:
+        session.close()
+        return jsonify({'error': str(e)}), 400
     result = [
         {
             'id': ml.id,
@@ -529,8 +1256,133 @@ def get_device_motion_logs(device_id):
         } for ml in motion_logs
     ]
     session.close()
+    if paginated:
+        return jsonify({'motion_logs': result, 'next_cursor': next_cursor})
+    response = jsonify(result)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+# Endpoint: Motion counts per sensor from the hourly/daily rollups
+@app.route('/api/devices/<int:device_id>/motion_rollups', methods=['GET'])
+def get_device_motion_rollups(device_id):
+    """Motion counts per sensor and bucket for a device.
+
+    Query params: granularity=hour|day (default hour), start/end (ISO-8601,
+    default the last 24 hours / 30 days), motion_sensor_id (optional).
+    """
+    granularity = request.args.get('granularity', 'hour')
+    if granularity not in ('hour', 'day'):
+        return jsonify({'error': "granularity must be 'hour' or 'day'"}), 400
+    model = MotionRollupHourly if granularity == 'hour' else MotionRollupDaily
+    try:
+        end = parse_event_timestamp(request.args.get('end'))
+        default_span = timedelta(hours=24) if granularity == 'hour' else timedelta(days=30)
+        start = parse_event_timestamp(request.args.get('start')) if request.args.get('start') else end - default_span
+    except ValueError:
+        return jsonify({'error': 'start and end must be ISO-8601 timestamps'}), 400
+    session = Session()
+    query = session.query(model).filter(
+        model.device_id == device_id,
+        model.bucket_start >= start,
+        model.bucket_start <= end
+    )
+    motion_sensor_id = request.args.get('motion_sensor_id', type=int)
+    if motion_sensor_id is not None:
+        query = query.filter(model.motion_sensor_id == motion_sensor_id)
+    result = [
+        {
+            'motion_sensor_id': r.motion_sensor_id,
+            'bucket_start': r.bucket_start.isoformat(),
+            'motion_count': r.motion_count
+        } for r in query.order_by(model.bucket_start, model.motion_sensor_id)
+    ]
+    session.close()
+    return jsonify({
+        'device_id': device_id,
+        'granularity': granularity,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'buckets': result
+    })
+
+# Endpoint: Motion analytics aggregated server-side from the rollups
+@app.route('/api/analytics/motion', methods=['GET'])
+def get_motion_analytics():
+    """Motion histogram, peak hours, busiest and idle sensors.
+
+    Query params: device_id and/or motion_sensor_id to scope (default the
+    whole fleet), start/end (ISO-8601, default the last 7 days), bucket
+    ('1h', '6h', '1d', ...; default '1h'), top (default 5).
+    """
+    try:
+        end = parse_event_timestamp(request.args.get('end'))
+        start = parse_event_timestamp(request.args.get('start')) if request.args.get('start') else end - timedelta(days=7)
+    except ValueError:
+        return jsonify({'error': 'start and end must be ISO-8601 timestamps'}), 400
+    if start >= end:
+        return jsonify({'error': 'start must be before end'}), 400
+    try:
+        bucket = parse_bucket(request.args.get('bucket', '1h'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    top = min(max(request.args.get('top', 5, type=int), 1), 50)
+    session = Session()
+    try:
+        result = motion_analytics(
+            session, start, end, bucket,
+            device_id=request.args.get('device_id', type=int),
+            motion_sensor_id=request.args.get('motion_sensor_id', type=int),
+            top=top
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    finally:
+        session.close()
     return jsonify(result)
 
+def parse_event_types(value):
+    return [t.strip() for t in value.split(',') if t.strip()] if value else None
+
+# Endpoint: Live change feed for dashboards (Server-Sent Events)
+@app.route('/api/events/stream')
+def stream_changes():
+    """Push typed change events (relay.status_changed, motion.detected, device.updated, ...).
+
+    ?types= is a comma-separated list of types or prefixes ('relay,motion').
+    Reconnecting clients resume after Last-Event-ID (or ?last_id=).
+    """
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('last_id')
+    try:
+        last_id = int(last_id) if last_id else None
+    except ValueError:
+        return jsonify({'error': 'last_id must be an integer'}), 400
+    types = parse_event_types(request.args.get('types'))
+    return Response(
+        stream_with_context(change_feed.stream(last_id, types)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+# Endpoint: Buffered change events after ?last_id= (for clients without SSE)
+@app.route('/api/events')
+def list_changes():
+    last_id = request.args.get('last_id', 0, type=int)
+    events = change_feed.since(last_id, parse_event_types(request.args.get('types')))
+    if events is None:
+        return jsonify({'error': 'last_id is older than the buffered events; refetch', 'last_id': change_feed.last_id}), 410
+    return jsonify({'events': events, 'last_id': change_feed.last_id})
+
+@app.route('/api/metrics')
+def metrics():
+    """Operational counters for the central server's caches and connection pool."""
+    return jsonify({
+        'token_cache': token_cache.stats(),
+        'presence': presence.stats(),
+        'relay_commands': command_stats.stats(),
+        'db_pool': pool_stats(engine)
+    })
+
 def get_lan_ip():
     try:
         import netifaces
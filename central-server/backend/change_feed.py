@@ -0,0 +1,118 @@
+"""
+Live change feed for dashboards.
+
+Write handlers record typed change events on their SQLAlchemy session with
+``record_change``; the events are published to ``change_feed`` only once the
+transaction commits, so subscribers never see a change that was rolled back.
+``ChangeFeed.stream`` renders the feed as Server-Sent Events. Events carry
+monotonically increasing ids and the last ``maxlen`` are buffered, so a
+reconnecting dashboard (``Last-Event-ID``) resumes without gaps or refetches.
+
+The feed is in-process: run the API as a single process (threads are fine)
+or every worker only sees its own writes.
+"""
+
+import json
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+
+
+class ChangeFeed:
+    def __init__(self, maxlen=1000):
+        self._events = deque(maxlen=maxlen)
+        self._cond = threading.Condition()
+        self._last_id = 0
+
+    @property
+    def last_id(self):
+        return self._last_id
+
+    def publish(self, changes):
+        """Assign ids to ``changes`` (a list of (type, data) tuples) and wake subscribers."""
+        with self._cond:
+            for change_type, data in changes:
+                self._last_id += 1
+                self._events.append({
+                    'id': self._last_id,
+                    'type': change_type,
+                    'data': data,
+                    'timestamp': time.time()
+                })
+            self._cond.notify_all()
+
+    def since(self, last_id, types=None):
+        """Buffered events newer than ``last_id``; None if ``last_id`` fell out of the buffer."""
+        with self._cond:
+            return self._since(last_id, types)
+
+    def _since(self, last_id, types):
+        if self._events and last_id < self._events[0]['id'] - 1:
+            return None
+        return [e for e in self._events if e['id'] > last_id and _matches(e['type'], types)]
+
+    def wait(self, last_id, timeout, types=None):
+        """Like ``since`` but blocks up to ``timeout`` seconds for a new event.
+
+        Returns (events, newest id scanned), so callers can skip ids that
+        ``types`` filtered out without missing later events.
+        """
+        with self._cond:
+            if self._last_id <= last_id:
+                self._cond.wait(timeout)
+            return self._since(last_id, types), self._last_id
+
+    def stream(self, last_id=None, types=None, keepalive=15):
+        """Generator of SSE chunks for events after ``last_id`` (default: from now on).
+
+        When the client is too far behind for the buffer, or ahead of it
+        because the server restarted and ids began again at 1, a ``resync``
+        event tells it to refetch its lists before continuing with live events.
+        """
+        stale = last_id is not None and last_id > self._last_id  # Id from before a restart
+        if last_id is None or stale:
+            last_id = self._last_id
+        yield 'retry: 3000\n\n'
+        if stale:
+            yield f'id: {last_id}\nevent: resync\ndata: {{}}\n\n'
+        while True:
+            events, scanned = self.wait(last_id, keepalive, types)
+            if events is None:
+                last_id = scanned
+                yield f'id: {last_id}\nevent: resync\ndata: {{}}\n\n'
+                continue
+            if not events:
+                yield ': keepalive\n\n'
+            for e in events:
+                yield f"id: {e['id']}\nevent: {e['type']}\ndata: {json.dumps(e)}\n\n"
+            last_id = max(last_id, scanned)  # Also skips ids filtered out by ``types``
+
+
+def _matches(change_type, types):
+    """True if ``change_type`` is in ``types`` or under one of its prefixes ('relay' matches 'relay.created')."""
+    if not types:
+        return True
+    return any(change_type == t or change_type.startswith(t + '.') for t in types)
+
+
+change_feed = ChangeFeed()
+
+
+def record_change(session, change_type, **data):
+    """Queue a change event to publish when ``session`` commits."""
+    session.info.setdefault('changes', []).append((change_type, data))
+
+
+@event.listens_for(OrmSession, 'after_commit')
+def _publish_after_commit(session):
+    changes = session.info.pop('changes', None)
+    if changes:
+        change_feed.publish(changes)
+
+
+@event.listens_for(OrmSession, 'after_rollback')
+def _discard_after_rollback(session):
+    session.info.pop('changes', None)
@@ -0,0 +1,64 @@
+"""
+In-process change notification for device config long-polling.
+
+Writes that bump a device's config_version record the device id on the
+SQLAlchemy session (see ``mark_config_changed``); once the transaction
+commits, waiters for that device are woken. Waiters hold no DB connection
+while they sleep.
+"""
+
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+
+
+class ConfigWatcher:
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._generations = {}  # device_id -> number of committed config changes seen in-process
+
+    def generation(self, device_id):
+        with self._cond:
+            return self._generations.get(device_id, 0)
+
+    def notify(self, device_ids):
+        with self._cond:
+            for device_id in device_ids:
+                self._generations[device_id] = self._generations.get(device_id, 0) + 1
+            self._cond.notify_all()
+
+    def wait(self, device_id, generation, timeout):
+        """Block until the device's generation moves past ``generation`` or timeout.
+
+        Returns True if a change was signalled.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._generations.get(device_id, 0) == generation:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+
+config_watcher = ConfigWatcher()
+
+
+def mark_config_changed(session, device_id):
+    """Queue a wake-up for ``device_id`` waiters when ``session`` commits."""
+    session.info.setdefault('config_changed', set()).add(device_id)
+
+
+@event.listens_for(OrmSession, 'after_commit')
+def _notify_after_commit(session):
+    changed = session.info.pop('config_changed', None)
+    if changed:
+        config_watcher.notify(changed)
+
+
+@event.listens_for(OrmSession, 'after_rollback')
+def _discard_after_rollback(session):
+    session.info.pop('config_changed', None)
@@ -1,7 +1,10 @@
 from models import Base, get_engine
+from migrations import run_migrations
 
 if __name__ == '__main__':
     print('Creating all tables...')
     engine = get_engine()
     Base.metadata.create_all(engine)
+    print('Applying migrations...')
+    run_migrations(engine)
     print('Done.') 
\ No newline at end of file
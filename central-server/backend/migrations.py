@@ -0,0 +1,182 @@
+"""
+Versioned schema migrations for the central server database.
+
+``Base.metadata.create_all`` only creates missing tables, so columns and
+indexes added to existing tables are applied here. Each migration runs once,
+in order, and is recorded in the ``schema_migrations`` table. Statements are
+written to be idempotent so a fresh database (where create_all already built
+the latest schema) can run them safely.
+
+Usage:
+    python migrations.py                # apply pending migrations
+    python migrations.py --check-plans  # verify hot queries use their indexes
+"""
+
+import sys
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+
+
+def _create_motion_rollup_tables(conn):
+    from models import MotionRollupHourly, MotionRollupDaily, RollupWatermark
+    for model in (MotionRollupHourly, MotionRollupDaily, RollupWatermark):
+        model.__table__.create(conn, checkfirst=True)
+
+
+def _create_device_telemetry_table(conn):
+    from models import DeviceTelemetry
+    DeviceTelemetry.__table__.create(conn, checkfirst=True)
+
+
+def _create_relay_commands_table(conn):
+    from models import RelayCommand
+    RelayCommand.__table__.create(conn, checkfirst=True)
+
+
+def _add_motion_log_event_id(conn):
+    columns = {c['name'] for c in inspect(conn).get_columns('motion_logs')}
+    if 'event_id' not in columns:
+        conn.execute(text('ALTER TABLE motion_logs ADD COLUMN event_id VARCHAR(64)'))
+    conn.execute(text(
+        'CREATE UNIQUE INDEX IF NOT EXISTS ix_motion_logs_device_id_event_id ON motion_logs (device_id, event_id)'
+    ))
+
+
+def _add_device_config_version(conn):
+    columns = {c['name'] for c in inspect(conn).get_columns('devices')}
+    if 'config_version' not in columns:
+        conn.execute(text('ALTER TABLE devices ADD COLUMN config_version INTEGER NOT NULL DEFAULT 0'))
+
+
+# (version, description, [SQL strings or callables taking a connection])
+MIGRATIONS = [
+    (1, 'Add devices.config_version', [
+        _add_device_config_version,
+    ]),
+    (2, 'Indexes for device token, relay, motion sensor and motion log lookups', [
+        'CREATE UNIQUE INDEX IF NOT EXISTS ix_devices_token ON devices (token)',
+        'CREATE INDEX IF NOT EXISTS ix_relays_device_id ON relays (device_id)',
+        'CREATE INDEX IF NOT EXISTS ix_motion_sensors_device_id_is_active ON motion_sensors (device_id, is_active)',
+        'CREATE INDEX IF NOT EXISTS ix_motion_logs_device_id_motion_detected ON motion_logs (device_id, motion_detected)',
+        'CREATE INDEX IF NOT EXISTS ix_motion_logs_motion_sensor_id ON motion_logs (motion_sensor_id)',
+    ]),
+    (3, 'Extend motion log index with id for keyset pagination', [
+        'CREATE INDEX IF NOT EXISTS ix_motion_logs_device_id_motion_detected_id '
+        'ON motion_logs (device_id, motion_detected, id)',
+        'DROP INDEX IF EXISTS ix_motion_logs_device_id_motion_detected',
+    ]),
+    (4, 'Hourly/daily motion rollup tables and rollup watermarks', [
+        _create_motion_rollup_tables,
+    ]),
+    (5, 'Device telemetry time series', [
+        _create_device_telemetry_table,
+    ]),
+    (6, 'Relay command queue with acknowledgements', [
+        _create_relay_commands_table,
+    ]),
+    (7, 'Device event ids on motion logs for idempotent batch ingestion', [
+        _add_motion_log_event_id,
+    ]),
+]
+
+# Hot queries and the index each one must be able to use
+HOT_QUERY_PLANS = [
+    ('device by token',
+     "SELECT id FROM devices WHERE token = 'x'",
+     'ix_devices_token'),
+    ('relays by device',
+     'SELECT id FROM relays WHERE device_id = 1',
+     'ix_relays_device_id'),
+    ('active motion sensors by device',
+     'SELECT id FROM motion_sensors WHERE device_id = 1 AND is_active = true',
+     'ix_motion_sensors_device_id_is_active'),
+    ('latest motion logs by device',
+     'SELECT id FROM motion_logs WHERE device_id = 1 ORDER BY motion_detected DESC, id DESC LIMIT 100',
+     'ix_motion_logs_device_id_motion_detected_id'),
+    ('motion log keyset page',
+     "SELECT id FROM motion_logs WHERE device_id = 1 AND (motion_detected, id) < ('2024-01-01', 1000) "
+     'ORDER BY motion_detected DESC, id DESC LIMIT 100',
+     'ix_motion_logs_device_id_motion_detected_id'),
+    ('recent telemetry by device',
+     "SELECT id FROM device_telemetry WHERE device_id = 1 AND ts >= '2024-01-01' ORDER BY ts DESC LIMIT 100",
+     'ix_device_telemetry_device_id_ts'),
+    ('pending relay commands by device',
+     'SELECT id FROM relay_commands WHERE device_id = 1 AND acked_at IS NULL ORDER BY id',
+     'ix_relay_commands_device_id_acked_at'),
+]
+
+MIGRATION_LOCK_ID = 0x10f7a1  # pg advisory lock key, serializes concurrent server start-ups
+
+
+def current_version(conn):
+    row = conn.execute(text('SELECT MAX(version) FROM schema_migrations')).first()
+    return row[0] or 0
+
+
+def run_migrations(engine, log=print):
+    """Apply all pending migrations in a single transaction; returns the schema version."""
+    with engine.begin() as conn:
+        if conn.dialect.name == 'postgresql':
+            conn.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': MIGRATION_LOCK_ID})
+        conn.execute(text(
+            'CREATE TABLE IF NOT EXISTS schema_migrations ('
+            'version INTEGER PRIMARY KEY, '
+            'description VARCHAR(200), '
+            'applied_at TIMESTAMP)'
+        ))
+        version = current_version(conn)
+        for number, description, steps in MIGRATIONS:
+            if number <= version:
+                continue
+            log(f'Applying migration {number}: {description}')
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(text(step))
+            conn.execute(
+                text('INSERT INTO schema_migrations (version, description, applied_at) VALUES (:v, :d, :t)'),
+                {'v': number, 'd': description, 't': datetime.utcnow()}
+            )
+            version = number
+    return version
+
+
+def explain(conn, sql):
+    """Return the query plan for ``sql`` as a single string."""
+    if conn.dialect.name == 'postgresql':
+        # Tiny tables always favour a seq scan; disable it so the plan shows
+        # whether a usable index exists at all.
+        conn.execute(text('SET LOCAL enable_seqscan = off'))
+        rows = conn.execute(text('EXPLAIN ' + sql)).fetchall()
+    else:
+        rows = conn.execute(text('EXPLAIN QUERY PLAN ' + sql)).fetchall()
+    return '\n'.join(' '.join(str(col) for col in row) for row in rows)
+
+
+def check_query_plans(engine):
+    """Return a list of (name, plan) for hot queries that do not use their index."""
+    failures = []
+    with engine.connect() as conn:
+        for name, sql, index_name in HOT_QUERY_PLANS:
+            with conn.begin():
+                plan = explain(conn, sql)
+            if index_name not in plan:
+                failures.append((name, plan))
+    return failures
+
+
+if __name__ == '__main__':
+    from models import get_engine
+
+    engine = get_engine()
+    if '--check-plans' in sys.argv:
+        failures = check_query_plans(engine)
+        for name, plan in failures:
+            print(f'FAIL {name}:\n{plan}')
+        if failures:
+            sys.exit(1)
+        print(f'All {len(HOT_QUERY_PLANS)} hot queries use their indexes.')
+    else:
+        print(f'Schema at version {run_migrations(engine)}')
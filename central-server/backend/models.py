@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, DateTime, Text, Time
+from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, DateTime, Text, Time, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 import datetime
 import os
+import threading
+import time
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.pool import QueuePool
 
 # Load environment variables from .env
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'))
@@ -15,10 +19,88 @@ DB_PASS = os.getenv('DB_PASS', 'password')
 DB_HOST = os.getenv('DB_HOST', 'localhost')
 DB_PORT = os.getenv('DB_PORT', '5432')
 
-DATABASE_URL = f'postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
+DATABASE_URL = f'postgresql+psycopg2://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
+
+# Connection pool settings
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '20'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))  # seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))  # seconds before a connection is replaced
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', '1') == '1'
+DB_CONNECT_TIMEOUT = int(os.getenv('DB_CONNECT_TIMEOUT', '3'))  # seconds to establish a new connection
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that counts checkouts, waits for a free connection and timeouts."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.timeouts = 0
+
+    def _do_get(self):
+        saturated = self._max_overflow > -1 and self.checkedout() >= self.size() + self._max_overflow
+        started = time.monotonic()
+        try:
+            conn = super()._do_get()
+        except sa_exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            if saturated:
+                self.waits += 1
+                self.wait_seconds += time.monotonic() - started
+        self.checkouts += 1
+        return conn
+
+    def recreate(self):
+        # Keep counters across engine.dispose()
+        new_pool = super().recreate()
+        for name in ('checkouts', 'waits', 'wait_seconds', 'timeouts'):
+            setattr(new_pool, name, getattr(self, name))
+        return new_pool
+
+_engine = None
+_engine_lock = threading.Lock()
 
 def get_engine():
-    return create_engine(DATABASE_URL)
+    """Return the process-wide pooled engine, creating it on first use."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = create_engine(
+                DATABASE_URL,
+                poolclass=InstrumentedQueuePool,
+                pool_size=DB_POOL_SIZE,
+                max_overflow=DB_MAX_OVERFLOW,
+                pool_timeout=DB_POOL_TIMEOUT,
+                pool_recycle=DB_POOL_RECYCLE,
+                pool_pre_ping=DB_POOL_PRE_PING,
+                connect_args={'connect_timeout': DB_CONNECT_TIMEOUT}
+            )
+        return _engine
+
+def pool_stats(engine):
+    """Snapshot of connection pool usage for the metrics endpoint."""
+    pool = engine.pool
+    stats = {'class': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            'size': pool.size(),
+            'max_overflow': pool._max_overflow,
+            'checked_out': pool.checkedout(),
+            'checked_in': pool.checkedin(),
+            'overflow': pool.overflow()
+        })
+    if isinstance(pool, InstrumentedQueuePool):
+        stats.update({
+            'checkouts': pool.checkouts,
+            'waits': pool.waits,
+            'wait_seconds': round(pool.wait_seconds, 3),
+            'timeouts': pool.timeouts
+        })
+    return stats
 
 Base = declarative_base()
 
@@ -27,10 +109,11 @@ class Device(Base):
     id = Column(Integer, primary_key=True)
     name = Column(String(100), nullable=False)
     ip_address = Column(String(45))
-    token = Column(String(128))
+    token = Column(String(128), index=True, unique=True)
     last_seen = Column(DateTime)
     description = Column(Text)
     is_active = Column(Boolean, default=True)
+    config_version = Column(Integer, nullable=False, default=0, server_default='0')  # Bumped on every relay/motion sensor write
     relays = relationship('Relay', back_populates='device')
     sensors = relationship('Sensor', back_populates='device')
     status_logs = relationship('StatusLog', back_populates='device')
@@ -39,7 +122,7 @@ class Device(Base):
 class Relay(Base):
     __tablename__ = 'relays'
     id = Column(Integer, primary_key=True)
-    device_id = Column(Integer, ForeignKey('devices.id'))
+    device_id = Column(Integer, ForeignKey('devices.id'), index=True)
     name = Column(String(100), nullable=False)
     gpio_pin = Column(Integer, nullable=False)
     status = Column(Boolean, default=False)
@@ -61,6 +144,9 @@ class Sensor(Base):
 
 class MotionSensor(Base):
     __tablename__ = 'motion_sensors'
+    __table_args__ = (
+        Index('ix_motion_sensors_device_id_is_active', 'device_id', 'is_active'),
+    )
     
     id = Column(Integer, primary_key=True)
     device_id = Column(Integer, ForeignKey('devices.id'), nullable=False)
@@ -89,14 +175,82 @@ class MotionSensor(Base):
 
 class MotionLog(Base):
     __tablename__ = 'motion_logs'
+    __table_args__ = (
+        Index('ix_motion_logs_device_id_motion_detected_id', 'device_id', 'motion_detected', 'id'),
+        # Unique so a batch re-sent after a lost response is ignored row by row (NULL ids never collide)
+        Index('ix_motion_logs_device_id_event_id', 'device_id', 'event_id', unique=True),
+    )
     id = Column(Integer, primary_key=True)
-    motion_sensor_id = Column(Integer, ForeignKey('motion_sensors.id'))
+    motion_sensor_id = Column(Integer, ForeignKey('motion_sensors.id'), index=True)
     device_id = Column(Integer, ForeignKey('devices.id'))
     motion_detected = Column(DateTime, default=datetime.datetime.utcnow)
     is_alert_sent = Column(Boolean, default=False)
     alert_sent_at = Column(DateTime)
+    event_id = Column(String(64))  # Device-assigned id from batch reports, null for single reports
     motion_sensor = relationship('MotionSensor', back_populates='motion_logs')
 
+class MotionRollupHourly(Base):
+    """Motion counts per sensor per hour, maintained incrementally from motion_logs."""
+    __tablename__ = 'motion_rollups_hourly'
+    __table_args__ = (
+        Index('ix_motion_rollups_hourly_device_id_bucket_start', 'device_id', 'bucket_start'),
+    )
+    motion_sensor_id = Column(Integer, ForeignKey('motion_sensors.id', ondelete='CASCADE'), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)  # UTC, truncated to the hour
+    device_id = Column(Integer, ForeignKey('devices.id', ondelete='CASCADE'), nullable=False)
+    motion_count = Column(Integer, nullable=False, default=0)
+
+class MotionRollupDaily(Base):
+    """Motion counts per sensor per UTC day, maintained incrementally from motion_logs."""
+    __tablename__ = 'motion_rollups_daily'
+    __table_args__ = (
+        Index('ix_motion_rollups_daily_device_id_bucket_start', 'device_id', 'bucket_start'),
+    )
+    motion_sensor_id = Column(Integer, ForeignKey('motion_sensors.id', ondelete='CASCADE'), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)  # UTC midnight
+    device_id = Column(Integer, ForeignKey('devices.id', ondelete='CASCADE'), nullable=False)
+    motion_count = Column(Integer, nullable=False, default=0)
+
+class RollupWatermark(Base):
+    """Progress marker for incremental rollup jobs."""
+    __tablename__ = 'rollup_watermarks'
+    name = Column(String(50), primary_key=True)
+    last_id = Column(Integer, nullable=False, default=0)  # Highest source row id already rolled up
+    pending_high_id = Column(Integer, nullable=False, default=0)  # Max source id seen on the previous run
+    updated_at = Column(DateTime)
+
+class DeviceTelemetry(Base):
+    """Periodic health sample pushed by an edge device (append-only time series)."""
+    __tablename__ = 'device_telemetry'
+    __table_args__ = (
+        # Unique so a batch re-sent after a lost response is ignored row by row
+        Index('ix_device_telemetry_device_id_ts', 'device_id', 'ts', unique=True),
+    )
+    id = Column(Integer, primary_key=True)
+    device_id = Column(Integer, ForeignKey('devices.id', ondelete='CASCADE'), nullable=False)
+    ts = Column(DateTime, nullable=False)  # UTC, sample time on the device
+    cpu_percent = Column(Float)
+    memory_percent = Column(Float)
+    disk_percent = Column(Float)
+    temperature = Column(Float)  # Celsius, null if the device has no sensor
+
+class RelayCommand(Base):
+    """Relay switch requested from the dashboard, delivered to the device and acknowledged."""
+    __tablename__ = 'relay_commands'
+    __table_args__ = (
+        Index('ix_relay_commands_device_id_acked_at', 'device_id', 'acked_at'),
+    )
+    id = Column(Integer, primary_key=True)
+    device_id = Column(Integer, ForeignKey('devices.id', ondelete='CASCADE'), nullable=False)
+    relay_id = Column(Integer, ForeignKey('relays.id', ondelete='CASCADE'), nullable=False)
+    status = Column(Boolean, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+    delivered_at = Column(DateTime)  # Last handed to the device
+    acked_at = Column(DateTime)  # Set on ack, or when superseded by a newer command for the relay
+    ok = Column(Boolean)
+    error = Column(String(200))
+    latency_ms = Column(Float)  # created_at -> acked_at
+
 class StatusLog(Base):
     __tablename__ = 'status_logs'
     id = Column(Integer, primary_key=True)
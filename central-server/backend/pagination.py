@@ -0,0 +1,84 @@
+"""
+Keyset (cursor) pagination helpers for list endpoints.
+
+A cursor is an opaque, URL-safe encoding of the sort-key values of the last
+row on a page. The next page filters on ``(sort keys) > cursor`` (or ``<`` for
+descending order) instead of using OFFSET, so deep pages cost the same as the
+first one as long as the sort keys are indexed.
+"""
+
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import DateTime, Integer, tuple_
+
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+
+
+def encode_cursor(values):
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    """Decode ``cursor`` into values matching ``columns``; raises ValueError if malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError('Invalid cursor')
+    return [_decode_value(column, value) for column, value in zip(columns, values)]
+
+
+def _decode_value(column, value):
+    """Check one cursor value against its column's type; raises ValueError on a mismatch."""
+    if isinstance(column.type, DateTime):
+        if not isinstance(value, str):
+            raise ValueError('Invalid cursor')
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            raise ValueError('Invalid cursor')
+    if isinstance(column.type, Integer):
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise ValueError('Invalid cursor')
+        return value
+    if not isinstance(value, str):
+        raise ValueError('Invalid cursor')
+    return value
+
+
+def wants_pagination(args):
+    return 'limit' in args or 'after' in args
+
+
+def page_limit(args, default=DEFAULT_PAGE_LIMIT):
+    """Read ?limit= clamped to [1, MAX_PAGE_LIMIT]; raises ValueError if not an integer."""
+    raw = args.get('limit')
+    if raw is None:
+        return default
+    return max(1, min(int(raw), MAX_PAGE_LIMIT))
+
+
+def keyset_page(query, columns, limit, after=None, descending=False):
+    """Return (rows, next_cursor) for one page of ``query`` ordered by ``columns``.
+
+    ``columns`` must uniquely order the rows (end with the primary key).
+    """
+    if after:
+        values = decode_cursor(after, columns)
+        key = tuple_(*columns) if len(columns) > 1 else columns[0]
+        bound = tuple_(*values) if len(columns) > 1 else values[0]
+        query = query.filter(key < bound if descending else key > bound)
+    order = [c.desc() for c in columns] if descending else list(columns)
+    rows = query.order_by(*order).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, c.key) for c in columns])
+    return rows, next_cursor
@@ -0,0 +1,126 @@
+"""
+Device presence tracking with write-coalesced ``devices.last_seen`` updates.
+
+Every authenticated device request calls ``touch``, which only updates an
+in-memory map. A flusher thread writes all devices touched since the previous
+flush with a single bulk ``UPDATE`` every few seconds, so request volume never
+turns into per-request writes. The online/offline view is answered from the
+same map without querying the devices table.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, update
+
+from models import Device
+
+logger = logging.getLogger('central.presence')
+
+
+class PresenceTracker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_seen = {}  # device_id -> naive UTC datetime (None if never seen)
+        self._dirty = {}  # device_id -> last_seen not yet written to the database
+        self._thread = None
+        self.flushes = 0
+        self.rows_written = 0
+
+    def load(self, Session):
+        """Seed the map from the database once, so presence survives restarts."""
+        session = Session()
+        try:
+            rows = session.query(Device.id, Device.last_seen).all()
+        finally:
+            session.close()
+        with self._lock:
+            for device_id, last_seen in rows:
+                current = self._last_seen.get(device_id)
+                if current is None or (last_seen and last_seen > current):
+                    self._last_seen[device_id] = last_seen
+
+    def register(self, device_id):
+        with self._lock:
+            self._last_seen.setdefault(device_id, None)
+
+    def forget(self, device_id):
+        with self._lock:
+            self._last_seen.pop(device_id, None)
+            self._dirty.pop(device_id, None)
+
+    def touch(self, device_id, when=None):
+        when = when or datetime.utcnow()
+        with self._lock:
+            current = self._last_seen.get(device_id)
+            if current is None or when > current:
+                self._last_seen[device_id] = when
+                self._dirty[device_id] = when
+
+    def last_seen(self, device_id):
+        with self._lock:
+            return self._last_seen.get(device_id)
+
+    def snapshot(self, online_timeout):
+        """Return (online, offline) lists of (device_id, last_seen)."""
+        cutoff = datetime.utcnow() - timedelta(seconds=online_timeout)
+        online, offline = [], []
+        with self._lock:
+            items = sorted(self._last_seen.items())
+        for device_id, last_seen in items:
+            (online if last_seen and last_seen >= cutoff else offline).append((device_id, last_seen))
+        return online, offline
+
+    def flush(self, Session):
+        """Write pending last_seen values with one UPDATE; returns rows written."""
+        with self._lock:
+            pending, self._dirty = self._dirty, {}
+        if not pending:
+            return 0
+        session = Session()
+        try:
+            session.execute(
+                update(Device)
+                .where(Device.id.in_(list(pending)))
+                .values(last_seen=case(pending, value=Device.id))
+                .execution_options(synchronize_session=False)
+            )
+            session.commit()
+        except Exception:
+            session.rollback()
+            with self._lock:
+                for device_id, when in pending.items():
+                    if device_id in self._last_seen and device_id not in self._dirty:
+                        self._dirty[device_id] = when  # Retry on the next flush
+            raise
+        finally:
+            session.close()
+        self.flushes += 1
+        self.rows_written += len(pending)
+        return len(pending)
+
+    def start(self, Session, interval):
+        def worker():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.flush(Session)
+                except Exception as e:
+                    logger.error(f'Presence flush failed: {e}')
+
+        if self._thread is None:
+            self._thread = threading.Thread(target=worker, name='presence-flush', daemon=True)
+            self._thread.start()
+        return self
+
+    def stats(self):
+        with self._lock:
+            tracked, pending = len(self._last_seen), len(self._dirty)
+        return {
+            'tracked_devices': tracked,
+            'pending_writes': pending,
+            'flushes': self.flushes,
+            'rows_written': self.rows_written
+        }
@@ -0,0 +1,258 @@
+"""
+Bulk provisioning of devices with their relays and motion sensors.
+
+Accepts the same fields as the single-item create endpoints, either as JSON
+(a list of devices, each with nested ``relays`` and ``motion_sensors``) or as
+CSV with one row per channel (see ``CSV_COLUMNS``). Everything is validated
+up front: GPIO pins must be valid BCM pins and unique per device, tokens
+unique. Valid input is written with one multi-row INSERT per table in a
+single transaction, so a hall of Pis is either provisioned completely or
+not at all.
+"""
+
+import csv
+import io
+import secrets
+from datetime import datetime
+
+from sqlalchemy import Boolean, Integer, String, insert
+
+from models import Device, Relay, MotionSensor
+
+VALID_GPIO_PINS = range(0, 28)  # BCM numbering on the Raspberry Pi header
+SENSITIVITIES = ('low', 'medium', 'high')
+TRIGGER_MODES = ('single', 'repeat')
+
+# One row per channel; rows sharing device_name belong to the same device.
+# A row with an empty type only declares the device.
+CSV_COLUMNS = (
+    'device_name', 'ip_address', 'description', 'token', 'type', 'name', 'gpio_pin', 'status',
+    'is_active', 'start_time', 'end_time', 'timezone', 'enable_scheduling',
+    'weekday_monitoring', 'weekend_monitoring', 'sensitivity', 'delay_time', 'trigger_mode'
+)
+MOTION_SENSOR_FIELDS = (
+    'is_active', 'start_time', 'end_time', 'timezone', 'enable_scheduling',
+    'weekday_monitoring', 'weekend_monitoring', 'sensitivity', 'delay_time', 'trigger_mode'
+)
+CSV_BOOLEAN_FIELDS = ('status', 'is_active', 'enable_scheduling', 'weekday_monitoring', 'weekend_monitoring')
+
+
+def _csv_bool(value):
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'y', 'on')
+
+
+def parse_csv(text):
+    """Group CSV channel rows into the JSON device structure."""
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames or 'device_name' not in reader.fieldnames:
+        raise ValueError('CSV header must include device_name')
+    unknown = set(reader.fieldnames) - set(CSV_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown CSV columns: {', '.join(sorted(unknown))}")
+    devices = {}
+    for row in reader:
+        row = {k: (v or '').strip() for k, v in row.items() if k}
+        device_name = row.get('device_name')
+        if not device_name:
+            raise ValueError(f'Row {reader.line_num}: device_name is required')
+        device = devices.setdefault(device_name, {'name': device_name, 'relays': [], 'motion_sensors': []})
+        for field in ('ip_address', 'description', 'token'):
+            if row.get(field):
+                device[field] = row[field]
+        kind = row.get('type', '').lower()
+        if not kind:
+            continue
+        channel = {'name': row.get('name'), 'gpio_pin': row.get('gpio_pin')}
+        extra = ('status',) if kind == 'relay' else MOTION_SENSOR_FIELDS
+        for field in extra:
+            if row.get(field):
+                channel[field] = _csv_bool(row[field]) if field in CSV_BOOLEAN_FIELDS else row[field]
+        if kind == 'relay':
+            device['relays'].append(channel)
+        elif kind in ('motion_sensor', 'motion'):
+            device['motion_sensors'].append(channel)
+        else:
+            raise ValueError(f"Row {reader.line_num}: type must be 'relay' or 'motion_sensor'")
+    return list(devices.values())
+
+
+def _parse_int(value):
+    """int() for ints, integral floats and numeric strings; rejects booleans and fractions."""
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError
+    return int(value)
+
+
+def _parse_pin(value):
+    pin = _parse_int(value)
+    if pin not in VALID_GPIO_PINS:
+        raise ValueError
+    return pin
+
+
+def _parse_time(value):
+    return datetime.strptime(value, '%H:%M').time() if value else None
+
+
+def _field_errors(data, model, fields):
+    """Type errors for Boolean, Integer and String ``fields`` present in ``data``, checked against ``model``'s columns.
+
+    Integer fields (GPIO pins, delays) must be non-negative.
+    """
+    errors = []
+    for field in fields:
+        if field not in data:
+            continue
+        value = data[field]
+        column_type = model.__table__.c[field].type
+        if isinstance(column_type, Boolean) and not isinstance(value, bool):
+            errors.append((field, f'{field} must be true or false'))
+        elif isinstance(column_type, Integer):
+            try:
+                if _parse_int(value) < 0:
+                    raise ValueError
+            except (TypeError, ValueError):
+                errors.append((field, f'{field} must be a non-negative integer'))
+        elif isinstance(column_type, String) and value is not None:
+            if not isinstance(value, str):
+                errors.append((field, f'{field} must be a string'))
+            elif column_type.length and len(value) > column_type.length:
+                errors.append((field, f'{field} must be at most {column_type.length} characters'))
+    return errors
+
+
+def validate_devices(devices, existing_tokens):
+    """Check devices and build insert rows; returns (plans, errors).
+
+    ``existing_tokens`` is the set of tokens already in the database. Each
+    plan is (device row, relay rows, motion sensor rows); errors are
+    {'device', 'field', 'error'} dicts.
+    """
+    plans, errors = [], []
+    if not isinstance(devices, list):
+        return plans, [{'device': None, 'field': 'devices', 'error': 'devices must be a list'}]
+    seen_tokens = set()
+    for index, data in enumerate(devices):
+        label = data.get('name') if isinstance(data, dict) and data.get('name') else f'#{index}'
+
+        def error(field, message):
+            errors.append({'device': label, 'field': field, 'error': message})
+
+        if not isinstance(data, dict) or not data.get('name'):
+            error('name', 'Device name is required')
+            continue
+        field_errors = _field_errors(data, Device, ('name', 'ip_address', 'token', 'description', 'is_active'))
+        for field, message in field_errors:
+            error(field, message)
+        if field_errors:
+            continue
+        token = data.get('token') or secrets.token_hex(16)
+        if token in existing_tokens or token in seen_tokens:
+            error('token', 'Token is already in use')
+        seen_tokens.add(token)
+        device_row = {
+            'name': data['name'],
+            'ip_address': data.get('ip_address'),
+            'token': token,
+            'description': data.get('description'),
+            'is_active': data.get('is_active', True)
+        }
+
+        pins = {}
+        relay_rows, sensor_rows = [], []
+        for kind, channels in (('relays', data.get('relays') or []), ('motion_sensors', data.get('motion_sensors') or [])):
+            if not isinstance(channels, list):
+                error(kind, f'{kind} must be a list')
+                continue
+            for position, channel in enumerate(channels):
+                field = f'{kind}[{position}]'
+                if not isinstance(channel, dict) or not channel.get('name'):
+                    error(field, 'Name is required')
+                    continue
+                if kind == 'relays':
+                    field_errors = _field_errors(channel, Relay, ('name', 'gpio_pin', 'status'))
+                else:
+                    field_errors = _field_errors(channel, MotionSensor, (
+                        'name', 'gpio_pin', 'is_active', 'timezone', 'enable_scheduling', 'weekday_monitoring',
+                        'weekend_monitoring', 'delay_time'
+                    ))
+                for name, message in field_errors:
+                    error(f'{field}.{name}', message)
+                if field_errors:
+                    continue
+                try:
+                    pin = _parse_pin(channel.get('gpio_pin'))
+                except (TypeError, ValueError):
+                    error(field, f'gpio_pin must be a BCM pin between {VALID_GPIO_PINS.start} and {VALID_GPIO_PINS.stop - 1}')
+                    continue
+                if pin in pins:
+                    error(field, f'GPIO {pin} is already used by {pins[pin]}')
+                    continue
+                pins[pin] = f"{kind}[{position}] '{channel['name']}'"
+                if kind == 'relays':
+                    relay_rows.append({'name': channel['name'], 'gpio_pin': pin, 'status': channel.get('status', False)})
+                    continue
+                try:
+                    start_time = _parse_time(channel.get('start_time'))
+                    end_time = _parse_time(channel.get('end_time'))
+                except (TypeError, ValueError):
+                    error(field, 'Invalid start_time/end_time format. Use HH:MM')
+                    continue
+                sensitivity = channel.get('sensitivity', 'medium')
+                trigger_mode = channel.get('trigger_mode', 'single')
+                if sensitivity not in SENSITIVITIES:
+                    error(field, f"sensitivity must be one of {', '.join(SENSITIVITIES)}")
+                    continue
+                if trigger_mode not in TRIGGER_MODES:
+                    error(field, f"trigger_mode must be one of {', '.join(TRIGGER_MODES)}")
+                    continue
+                delay_time = _parse_int(channel.get('delay_time', 3))  # Checked by _field_errors
+                sensor_rows.append({
+                    'name': channel['name'],
+                    'gpio_pin': pin,
+                    'is_active': channel.get('is_active', True),
+                    'start_time': start_time,
+                    'end_time': end_time,
+                    'timezone': channel.get('timezone', 'UTC'),
+                    'enable_scheduling': channel.get('enable_scheduling', False),
+                    'weekend_monitoring': channel.get('weekend_monitoring', True),
+                    'weekday_monitoring': channel.get('weekday_monitoring', True),
+                    'sensitivity': sensitivity,
+                    'delay_time': delay_time,
+                    'trigger_mode': trigger_mode
+                })
+        plans.append((device_row, relay_rows, sensor_rows))
+    return plans, errors
+
+
+def provision(session, plans):
+    """Insert validated plans with one INSERT per table (committed by the caller).
+
+    Returns the created devices with their ids, tokens and channels.
+    """
+    device_ids = session.execute(
+        insert(Device).returning(Device.id, sort_by_parameter_order=True),
+        [device_row for device_row, _, _ in plans]
+    ).scalars().all()
+
+    relay_rows, sensor_rows = [], []
+    for device_id, (_, relays, sensors) in zip(device_ids, plans):
+        relay_rows.extend(dict(row, device_id=device_id) for row in relays)
+        sensor_rows.extend(dict(row, device_id=device_id) for row in sensors)
+    relay_ids = session.execute(
+        insert(Relay).returning(Relay.id, sort_by_parameter_order=True), relay_rows
+    ).scalars().all() if relay_rows else []
+    sensor_ids = session.execute(
+        insert(MotionSensor).returning(MotionSensor.id, sort_by_parameter_order=True), sensor_rows
+    ).scalars().all() if sensor_rows else []
+
+    created, relay_ids, sensor_ids = [], iter(relay_ids), iter(sensor_ids)
+    for device_id, (device_row, relays, sensors) in zip(device_ids, plans):
+        created.append({
+            'id': device_id,
+            'name': device_row['name'],
+            'token': device_row['token'],
+            'relays': [{'id': next(relay_ids), 'name': r['name'], 'gpio_pin': r['gpio_pin']} for r in relays],
+            'motion_sensors': [{'id': next(sensor_ids), 'name': s['name'], 'gpio_pin': s['gpio_pin']} for s in sensors]
+        })
+    return created
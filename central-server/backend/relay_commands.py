@@ -0,0 +1,168 @@
+"""
+Relay command queue between the dashboard and edge devices.
+
+Switching a relay from the dashboard enqueues a ``RelayCommand`` and wakes
+the device's config long-poll (see ``config_watch``) without bumping its
+config version, so the device gets the command in the poll response, drives
+just that pin and acknowledges it. A newer command for the same relay
+supersedes any that are still pending, so a device that was offline only
+applies the latest state. A failed acknowledgement rolls the relay's status
+back to the state the pin kept. Latency is measured from enqueue to
+acknowledgement.
+"""
+
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from models import RelayCommand
+from config_watch import mark_config_changed
+
+
+class RelayCommandStats:
+    """In-process counters and recent ack latencies for the metrics endpoint."""
+
+    def __init__(self, window=500):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self.enqueued = 0
+        self.acked = 0
+        self.failed = 0
+        self.superseded = 0
+
+    def record_enqueue(self, superseded):
+        with self._lock:
+            self.enqueued += 1
+            self.superseded += superseded
+
+    def record_ack(self, latency_ms, ok):
+        with self._lock:
+            self.acked += 1
+            if not ok:
+                self.failed += 1
+            self._latencies.append(latency_ms)
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            result = {
+                'enqueued': self.enqueued,
+                'acked': self.acked,
+                'failed': self.failed,
+                'superseded': self.superseded
+            }
+        if latencies:
+            result.update({
+                'latency_ms_p50': round(latencies[len(latencies) // 2], 1),
+                'latency_ms_p95': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 1),
+                'latency_ms_max': round(latencies[-1], 1)
+            })
+        return result
+
+
+command_stats = RelayCommandStats()
+
+
+def enqueue_relay_command(session, relay, status):
+    """Queue a switch of ``relay`` to ``status`` (committed by the caller).
+
+    Returns (command, number of pending commands it superseded); the caller
+    records both with ``command_stats.record_enqueue`` once committed.
+    """
+    now = datetime.utcnow()
+    superseded = session.query(RelayCommand).filter(
+        RelayCommand.relay_id == relay.id, RelayCommand.acked_at.is_(None)
+    ).update({
+        RelayCommand.acked_at: now,
+        RelayCommand.ok: False,
+        RelayCommand.error: 'superseded'
+    }, synchronize_session=False)
+    command = RelayCommand(device_id=relay.device_id, relay_id=relay.id, status=bool(status), created_at=now)
+    session.add(command)
+    mark_config_changed(session, relay.device_id)
+    return command, superseded
+
+
+def pending_relay_commands(session, device_id, redeliver_after):
+    """Unacknowledged commands due for delivery, oldest first; marks them delivered.
+
+    A command handed out less than ``redeliver_after`` seconds ago is held
+    back, so a device that never acknowledges gets it again at that interval
+    instead of in a tight loop. Returns (commands, seconds until the next
+    held-back command is due, or None if there is none).
+    """
+    now = datetime.utcnow()
+    commands = session.query(RelayCommand).filter(
+        RelayCommand.device_id == device_id, RelayCommand.acked_at.is_(None)
+    ).order_by(RelayCommand.id).all()
+    result = []
+    retry_in = None
+    for command in commands:
+        if command.delivered_at is not None:
+            due_in = redeliver_after - (now - command.delivered_at).total_seconds()
+            if due_in > 0:
+                retry_in = due_in if retry_in is None else min(retry_in, due_in)
+                continue
+        command.delivered_at = now
+        result.append({
+            'id': command.id,
+            'relay_id': command.relay_id,
+            'status': command.status,
+            'created_at': command.created_at.isoformat()
+        })
+    return result, retry_in
+
+
+def latest_command_ids(session, relay_ids):
+    """Newest command id issued for each relay in ``relay_ids`` (relays without commands are omitted)."""
+    return dict(
+        session.query(RelayCommand.relay_id, func.max(RelayCommand.id))
+        .filter(RelayCommand.relay_id.in_(list(relay_ids)))
+        .group_by(RelayCommand.relay_id)
+    )
+
+
+def acknowledge_relay_commands(session, device_id, acks):
+    """Record acks [{id, ok, error}] for ``device_id``; returns (acked commands, unknown ids).
+
+    Commands that were already acknowledged or superseded are reported as unknown.
+    """
+    by_id = {int(ack['id']): ack for ack in acks}
+    now = datetime.utcnow()
+    commands = session.query(RelayCommand).filter(
+        RelayCommand.device_id == device_id,
+        RelayCommand.id.in_(list(by_id)),
+        RelayCommand.acked_at.is_(None)
+    ).all()
+    for command in commands:
+        ack = by_id[command.id]
+        command.acked_at = now
+        command.ok = bool(ack.get('ok', True))
+        command.error = (ack.get('error') or '')[:200] or None
+        command.latency_ms = round((now - command.created_at).total_seconds() * 1000, 1)
+    unknown = sorted(set(by_id) - {command.id for command in commands})
+    return commands, unknown
+
+
+def prune_relay_commands(Session, retention_days, chunk_size=5000, max_chunks=100):
+    """Delete acknowledged commands older than ``retention_days`` in bounded chunks; returns rows deleted."""
+    if not retention_days or retention_days <= 0:
+        return 0
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    deleted = 0
+    for _ in range(max_chunks):
+        session = Session()
+        try:
+            ids = [row.id for row in session.query(RelayCommand.id)
+                   .filter(RelayCommand.acked_at < cutoff).limit(chunk_size)]
+            if ids:
+                session.query(RelayCommand).filter(RelayCommand.id.in_(ids)).delete(synchronize_session=False)
+                session.commit()
+                deleted += len(ids)
+        finally:
+            session.close()
+        if len(ids) < chunk_size:
+            break
+    return deleted
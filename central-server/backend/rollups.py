@@ -0,0 +1,177 @@
+"""
+Incremental motion rollups and raw motion log retention.
+
+``roll_up_motion_logs`` folds new ``motion_logs`` rows into the hourly and
+daily count tables. It tracks progress by row id in ``rollup_watermarks``, so
+each run only reads rows it has not seen. ``prune_motion_logs`` then deletes
+raw rows older than the retention period in bounded chunks, never touching
+rows that have not been rolled up yet.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import Integer, cast, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import MotionLog, MotionRollupHourly, MotionRollupDaily, RollupWatermark
+
+logger = logging.getLogger('central.rollups')
+
+WATERMARK_NAME = 'motion_logs'
+
+
+def hour_bucket(column, dialect_name):
+    """SQL expression truncating a timestamp column to the hour."""
+    if dialect_name == 'postgresql':
+        return func.date_trunc('hour', column)
+    return func.strftime('%Y-%m-%d %H:00:00', column)
+
+
+def day_bucket(column, dialect_name):
+    """SQL expression truncating a timestamp column to UTC midnight."""
+    if dialect_name == 'postgresql':
+        return func.date_trunc('day', column)
+    return func.strftime('%Y-%m-%d 00:00:00', column)
+
+
+def hour_of_day(column, dialect_name):
+    """SQL expression extracting the hour (0-23) from a timestamp column."""
+    if dialect_name == 'postgresql':
+        return func.extract('hour', column)
+    return cast(func.strftime('%H', column), Integer)
+
+
+def _upsert(session, model, rows):
+    dialect_insert = postgresql.insert if session.bind.dialect.name == 'postgresql' else sqlite.insert
+    stmt = dialect_insert(model)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[model.motion_sensor_id, model.bucket_start],
+        set_={'motion_count': model.motion_count + stmt.excluded.motion_count}
+    )
+    session.execute(stmt, rows)
+
+
+def _get_watermark(session):
+    query = session.query(RollupWatermark).filter_by(name=WATERMARK_NAME)
+    if session.bind.dialect.name == 'postgresql':
+        query = query.with_for_update()  # One rollup run at a time across server processes
+    watermark = query.first()
+    if watermark is None:
+        watermark = RollupWatermark(name=WATERMARK_NAME, last_id=0, pending_high_id=0)
+        session.add(watermark)
+        session.flush()
+    return watermark
+
+
+def roll_up_motion_logs(Session, batch_size=50000):
+    """Fold unseen motion_logs rows into the rollup tables; returns rows processed.
+
+    Rows are only rolled up once their id was already the table maximum on a
+    previous run, which gives concurrent inserts holding lower ids time to
+    commit before the watermark passes them.
+    """
+    processed = 0
+    while True:
+        session = Session()
+        try:
+            watermark = _get_watermark(session)
+            low = watermark.last_id
+            high = min(watermark.pending_high_id, low + batch_size)
+            count = 0
+            if high > low:
+                bucket = hour_bucket(MotionLog.motion_detected, session.bind.dialect.name).label('bucket')
+                rows = session.execute(
+                    select(MotionLog.motion_sensor_id, MotionLog.device_id, bucket, func.count().label('n'))
+                    .where(MotionLog.id > low, MotionLog.id <= high, MotionLog.motion_sensor_id.isnot(None))
+                    .group_by(MotionLog.motion_sensor_id, MotionLog.device_id, bucket)
+                ).all()
+                hourly, daily = [], {}
+                for sensor_id, device_id, bucket_start, n in rows:
+                    if isinstance(bucket_start, str):
+                        bucket_start = datetime.fromisoformat(bucket_start)
+                    hourly.append({'motion_sensor_id': sensor_id, 'device_id': device_id,
+                                   'bucket_start': bucket_start, 'motion_count': n})
+                    day_key = (sensor_id, device_id, bucket_start.replace(hour=0))
+                    daily[day_key] = daily.get(day_key, 0) + n
+                    count += n
+                if hourly:
+                    _upsert(session, MotionRollupHourly, hourly)
+                    _upsert(session, MotionRollupDaily, [
+                        {'motion_sensor_id': s, 'device_id': d, 'bucket_start': b, 'motion_count': n}
+                        for (s, d, b), n in daily.items()
+                    ])
+                watermark.last_id = high
+            caught_up = high >= watermark.pending_high_id
+            if caught_up:
+                max_id = session.query(func.max(MotionLog.id)).scalar() or 0
+                watermark.pending_high_id = max(watermark.pending_high_id, max_id)
+            watermark.updated_at = datetime.utcnow()
+            session.commit()
+            processed += count
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+        if caught_up:
+            return processed
+
+
+def prune_motion_logs(Session, retention_days, chunk_size=5000, max_chunks=100):
+    """Delete rolled-up motion_logs rows older than ``retention_days``; returns rows deleted."""
+    if not retention_days or retention_days <= 0:
+        return 0
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    deleted = 0
+    for _ in range(max_chunks):
+        session = Session()
+        try:
+            watermark = session.query(RollupWatermark).filter_by(name=WATERMARK_NAME).first()
+            if watermark is None:
+                return deleted
+            ids = [row.id for row in session.query(MotionLog.id)
+                   .filter(MotionLog.motion_detected < cutoff, MotionLog.id <= watermark.last_id)
+                   .order_by(MotionLog.id).limit(chunk_size)]
+            if ids:
+                session.query(MotionLog).filter(MotionLog.id.in_(ids)).delete(synchronize_session=False)
+                session.commit()
+                deleted += len(ids)
+        finally:
+            session.close()
+        if len(ids) < chunk_size:
+            break
+    return deleted
+
+
+def start_rollup_worker(Session, interval, retention_days, batch_size=50000, chunk_size=5000, extra_tasks=()):
+    """Run rollups and retention every ``interval`` seconds on a daemon thread.
+
+    ``extra_tasks`` are (name, callable) pairs for other periodic retention
+    jobs; each callable returns the number of rows it removed.
+    """
+    def worker():
+        while True:
+            try:
+                started = time.monotonic()
+                rolled = roll_up_motion_logs(Session, batch_size)
+                pruned = prune_motion_logs(Session, retention_days, chunk_size)
+                if rolled or pruned:
+                    logger.info(f'Motion rollup: {rolled} logs rolled up, {pruned} pruned '
+                                f'in {time.monotonic() - started:.2f}s')
+            except Exception as e:
+                logger.error(f'Motion rollup failed: {e}')
+            for name, task in extra_tasks:
+                try:
+                    removed = task()
+                    if removed:
+                        logger.info(f'{name}: {removed} rows pruned')
+                except Exception as e:
+                    logger.error(f'{name} failed: {e}')
+            time.sleep(interval)
+
+    thread = threading.Thread(target=worker, name='motion-rollups', daemon=True)
+    thread.start()
+    return thread
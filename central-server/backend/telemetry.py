@@ -0,0 +1,114 @@
+"""
+Edge device telemetry: bulk ingestion, fleet health and retention.
+
+Devices push batches of periodic health samples (CPU, memory, disk,
+temperature). Each batch is written with one multi-row INSERT that skips
+samples already stored, so retried batches are harmless. ``fleet_health``
+answers "which devices are hot, full or overloaded" with a single query that
+joins every device to its latest sample and its recent averages.
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import Device, DeviceTelemetry
+
+METRICS = ('cpu_percent', 'memory_percent', 'disk_percent', 'temperature')
+
+
+def insert_telemetry(session, rows):
+    """Insert telemetry rows, ignoring (device_id, ts) pairs that already exist."""
+    dialect_insert = postgresql.insert if session.bind.dialect.name == 'postgresql' else sqlite.insert
+    stmt = dialect_insert(DeviceTelemetry).on_conflict_do_nothing(
+        index_elements=[DeviceTelemetry.device_id, DeviceTelemetry.ts]
+    )
+    session.execute(stmt, rows)
+
+
+def fleet_health(session, window, thresholds, problems_only=False):
+    """Latest sample, window averages and problem flags for every device.
+
+    ``window`` is a timedelta; devices without a sample in the window are
+    flagged ``stale``. ``thresholds`` has hot_temperature, full_disk,
+    overloaded_cpu and overloaded_memory (percent / Celsius).
+    """
+    since = datetime.utcnow() - window
+    recent = (
+        select(
+            DeviceTelemetry.device_id.label('device_id'),
+            func.max(DeviceTelemetry.ts).label('ts'),
+            func.avg(DeviceTelemetry.cpu_percent).label('cpu_avg'),
+            func.avg(DeviceTelemetry.memory_percent).label('memory_avg'),
+            func.max(DeviceTelemetry.temperature).label('temperature_max'),
+            func.count().label('samples')
+        )
+        .where(DeviceTelemetry.ts >= since)
+        .group_by(DeviceTelemetry.device_id)
+        .subquery()
+    )
+    rows = session.execute(
+        select(
+            Device.id, Device.name, Device.is_active,
+            recent.c.ts, recent.c.cpu_avg, recent.c.memory_avg, recent.c.temperature_max, recent.c.samples,
+            *[getattr(DeviceTelemetry, m) for m in METRICS]
+        )
+        .outerjoin(recent, recent.c.device_id == Device.id)
+        .outerjoin(DeviceTelemetry, and_(DeviceTelemetry.device_id == Device.id, DeviceTelemetry.ts == recent.c.ts))
+        .order_by(Device.id)
+    ).all()
+
+    devices = []
+    for row in rows:
+        flags = []
+        if row.ts is None:
+            flags.append('stale')
+        else:
+            if row.temperature is not None and row.temperature >= thresholds['hot_temperature']:
+                flags.append('hot')
+            if row.disk_percent is not None and row.disk_percent >= thresholds['full_disk']:
+                flags.append('full')
+            if ((row.cpu_avg or 0) >= thresholds['overloaded_cpu']
+                    or (row.memory_avg or 0) >= thresholds['overloaded_memory']):
+                flags.append('overloaded')
+        if problems_only and not flags:
+            continue
+        devices.append({
+            'device_id': row.id,
+            'name': row.name,
+            'is_active': row.is_active,
+            'last_sample': row.ts.isoformat() if row.ts else None,
+            'cpu_percent': row.cpu_percent,
+            'memory_percent': row.memory_percent,
+            'disk_percent': row.disk_percent,
+            'temperature': row.temperature,
+            'cpu_avg': round(row.cpu_avg, 1) if row.cpu_avg is not None else None,
+            'memory_avg': round(row.memory_avg, 1) if row.memory_avg is not None else None,
+            'temperature_max': row.temperature_max,
+            'samples': row.samples or 0,
+            'flags': flags
+        })
+    return devices
+
+
+def prune_telemetry(Session, retention_days, chunk_size=5000, max_chunks=100):
+    """Delete telemetry older than ``retention_days`` in bounded chunks; returns rows deleted."""
+    if not retention_days or retention_days <= 0:
+        return 0
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    deleted = 0
+    for _ in range(max_chunks):
+        session = Session()
+        try:
+            ids = [row.id for row in session.query(DeviceTelemetry.id)
+                   .filter(DeviceTelemetry.ts < cutoff).limit(chunk_size)]
+            if ids:
+                session.query(DeviceTelemetry).filter(DeviceTelemetry.id.in_(ids)).delete(synchronize_session=False)
+                session.commit()
+                deleted += len(ids)
+        finally:
+            session.close()
+        if len(ids) < chunk_size:
+            break
+    return deleted
@@ -0,0 +1,29 @@
+"""Fails when a hot query stops using its index (run with ``pytest test_migrations.py``)."""
+
+from sqlalchemy import create_engine
+
+from models import Base
+from migrations import MIGRATIONS, check_query_plans, current_version, run_migrations
+
+
+def migrated_engine(path):
+    engine = create_engine(f'sqlite:///{path}')
+    Base.metadata.create_all(engine)
+    run_migrations(engine, log=lambda message: None)
+    return engine
+
+
+def test_migrations_reach_latest_version(tmp_path):
+    engine = migrated_engine(tmp_path / 'central.db')
+    with engine.connect() as conn:
+        assert current_version(conn) == MIGRATIONS[-1][0]
+
+
+def test_migrations_are_idempotent(tmp_path):
+    engine = migrated_engine(tmp_path / 'central.db')
+    assert run_migrations(engine, log=lambda message: None) == MIGRATIONS[-1][0]
+
+
+def test_hot_queries_use_their_indexes(tmp_path):
+    engine = migrated_engine(tmp_path / 'central.db')
+    assert check_query_plans(engine) == []
@@ -0,0 +1,39 @@
+"""Cursor validation for keyset pagination."""
+
+import base64
+import json
+
+import pytest
+
+from models import Device, MotionLog
+from pagination import decode_cursor, encode_cursor
+
+MOTION_LOG_COLUMNS = [MotionLog.motion_detected, MotionLog.id]
+
+
+def raw_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def test_round_trip():
+    cursor = encode_cursor(['2024-01-01T12:00:00', 42])
+    assert [v.isoformat() if hasattr(v, 'isoformat') else v
+            for v in decode_cursor(cursor, MOTION_LOG_COLUMNS)] == ['2024-01-01T12:00:00', 42]
+    assert decode_cursor(encode_cursor([7]), [Device.id]) == [7]
+
+
+@pytest.mark.parametrize('cursor, columns', [
+    (raw_cursor([1, 2]), MOTION_LOG_COLUMNS),
+    (raw_cursor([None, None]), MOTION_LOG_COLUMNS),
+    (raw_cursor(['not a date', 1]), MOTION_LOG_COLUMNS),
+    (raw_cursor(['2024-01-01T12:00:00', '1']), MOTION_LOG_COLUMNS),
+    (raw_cursor([[1]]), [Device.id]),
+    (raw_cursor([True]), [Device.id]),
+    (raw_cursor([1.5]), [Device.id]),
+    (raw_cursor([1, 2]), [Device.id]),
+    (raw_cursor({'id': 1}), [Device.id]),
+    ('%%%', [Device.id]),
+])
+def test_invalid_cursors_raise_value_error(cursor, columns):
+    with pytest.raises(ValueError, match='Invalid cursor'):
+        decode_cursor(cursor, columns)
@@ -0,0 +1,69 @@
+"""
+Bounded LRU cache mapping device tokens to device ids.
+
+Device-authenticated endpoints resolve the caller's token here instead of
+loading the Device row on every request. Entries expire after ``ttl``
+seconds so token changes made by another server process are picked up
+eventually; changes made through this process invalidate immediately.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class DeviceTokenCache:
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # token -> (device_id, expires_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, token):
+        """Return the cached device id for ``token``, or None on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[token]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, token, device_id):
+        with self._lock:
+            self._entries[token] = (device_id, time.monotonic() + self.ttl)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate_device(self, device_id):
+        """Drop every token cached for ``device_id``."""
+        with self._lock:
+            stale = [t for t, (d, _) in self._entries.items() if d == device_id]
+            for token in stale:
+                del self._entries[token]
+            self.invalidations += len(stale)
+
+    def stats(self):
+        with self._lock:
+            size = len(self._entries)
+        lookups = self.hits + self.misses
+        return {
+            'size': size,
+            'maxsize': self.maxsize,
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations
+        }
@@ -74,10 +74,11 @@ function Dashboard({ isDarkMode }) {
         setInitialLoading(true);
       }
       
-      const response = await fetch(`${backendUrl}/api/devices`);
+      // One request returns devices with their relays and motion sensors nested
+      const response = await fetch(`${backendUrl}/api/fleet`);
       if (response.ok) {
         const data = await response.json();
-        setDevices(data);
+        setDevices(data.devices);
         setLastUpdate(new Date());
         setError(null);
         setIsConnected(true);
@@ -215,16 +216,67 @@ function Dashboard({ isDarkMode }) {
     }
   };
 
+  // Apply a change event from the server; structural changes trigger one debounced refetch
+  const applyChange = (type, change, scheduleRefetch) => {
+    if (type === 'relay.status_changed') {
+      setDevices(prev => prev.map(d => d.id !== change.device_id ? d : {
+        ...d,
+        relays: d.relays.map(r => r.id === change.relay_id ? { ...r, status: change.status } : r)
+      }));
+    } else if (type === 'motion.detected') {
+      setDevices(prev => prev.map(d => d.id !== change.device_id ? d : {
+        ...d,
+        motion_sensors: d.motion_sensors.map(ms => ms.id !== change.motion_sensor_id ? ms : {
+          ...ms,
+          motion_count: (ms.motion_count || 0) + change.count,
+          last_motion_detected: change.last_motion_detected
+        })
+      }));
+    } else {
+      scheduleRefetch();
+    }
+    setLastUpdate(new Date());
+  };
+
   useEffect(() => {
     // Initial load with loading
     fetchDevices(true);
-    
-    // Set up interval for updates without loading
-    const interval = setInterval(() => {
-      fetchDevices(false);
-    }, 10000); // Update every 10 seconds
-    
-    return () => clearInterval(interval);
+
+    // Live updates pushed by the server instead of polling
+    let refetchTimer = null;
+    const scheduleRefetch = () => {
+      clearTimeout(refetchTimer);
+      refetchTimer = setTimeout(() => fetchDevices(false), 300);
+    };
+    const source = new EventSource(`${backendUrl}/api/events/stream`);
+    const changeTypes = [
+      'device.created', 'device.updated', 'device.deleted',
+      'relay.created', 'relay.updated', 'relay.deleted', 'relay.status_changed',
+      'motion_sensor.created', 'motion_sensor.updated', 'motion_sensor.deleted',
+      'motion.detected'
+    ];
+    changeTypes.forEach(type => {
+      source.addEventListener(type, (e) => applyChange(type, JSON.parse(e.data).data, scheduleRefetch));
+    });
+    // Too far behind for the server's buffer: reload everything once
+    source.addEventListener('resync', scheduleRefetch);
+    let opened = false;
+    source.onopen = () => {
+      setIsConnected(true);
+      setError(null);
+      // Catch changes committed between the initial fetch and the stream opening
+      if (!opened) scheduleRefetch();
+      opened = true;
+    };
+    source.onerror = () => {
+      // EventSource reconnects on its own and resumes after the last event id
+      setIsConnected(false);
+    };
+
+    return () => {
+      clearTimeout(refetchTimer);
+      source.close();
+    };
   }, []);
 
   if (initialLoading) {
@@ -44,40 +44,47 @@ const MotionAlertManager = () => {
   const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:5000';
 
   useEffect(() => {
-    fetchAlerts();
-    const interval = setInterval(fetchAlerts, 2000); // Check for new alerts every 2 seconds
-    return () => clearInterval(interval);
-  }, []);
+    let eventSource = null;
+    let cancelled = false;
 
-  const fetchAlerts = async () => {
-    try {
-      const response = await fetch(`${API_BASE_URL}/api/motion_alerts`);
-      if (response.ok) {
-        const data = await response.json();
-        const newAlerts = data.alerts || [];
-        
-        // Check for new alerts
-        const newAlertIds = newAlerts.map(a => a.id);
-        const currentAlertIds = alerts.map(a => a.id);
-        const newAlertsOnly = newAlerts.filter(a => !currentAlertIds.includes(a.id));
-        
-        if (newAlertsOnly.length > 0) {
-          setAlerts(newAlerts);
-          // Show new alerts
-          newAlertsOnly.forEach(alert => {
-            showAlert(alert);
-          });
+    const loadAlerts = async () => {
+      try {
+        const response = await fetch(`${API_BASE_URL}/api/motion_alerts`);
+        if (response.ok) {
+          const data = await response.json();
+          setAlerts(data.alerts || []);
+          return data.last_id || 0;
         }
-        
-        setIsConnected(true);
-      } else {
-        setIsConnected(false);
+      } catch (err) {
+        console.error('Error fetching motion alerts:', err);
       }
-    } catch (err) {
-      console.error('Error fetching motion alerts:', err);
-      setIsConnected(false);
-    }
-  };
+      return 0;
+    };
+
+    const connect = async () => {
+      // Load alerts already buffered on the device, then stream new ones
+      const lastId = await loadAlerts();
+      if (cancelled) return;
+
+      // EventSource reconnects on its own and resumes via Last-Event-ID
+      eventSource = new EventSource(`${API_BASE_URL}/api/motion_alerts/stream?last_id=${lastId}`);
+      eventSource.onopen = () => setIsConnected(true);
+      eventSource.onerror = () => setIsConnected(false);
+      eventSource.addEventListener('motion_alert', (event) => {
+        const alert = JSON.parse(event.data);
+        setAlerts(prev => [...prev.filter(a => a.id !== alert.id), alert].slice(-100));
+        showAlert(alert);
+      });
+      // Sent after a device restart or when we missed more alerts than it buffers
+      eventSource.addEventListener('resync', () => loadAlerts());
+    };
+
+    connect();
+    return () => {
+      cancelled = true;
+      if (eventSource) eventSource.close();
+    };
+  }, []);
 
   const showAlert = (alert) => {
     // Add alert to visible alerts